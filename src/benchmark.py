@@ -0,0 +1,122 @@
+"""
+Convergence benchmark: cost of headless training to reach fitness targets.
+Usage:
+    python -m src.benchmark [--seeds M] [--first-seed S] [--thresholds T ...] [--generations N]
+                            [--population P] [--optimizer {ga,cmaes,nes}] [--max-ticks T] [--output FILE]
+
+Trains once per seed and records, for each threshold, the generation, the
+simulated player-ticks (ticks survived summed over the population, i.e. the
+evaluation cost) and the wall-clock seconds at which the best fitness first
+reached it. Writes JSON with per-seed results and, per threshold, the number
+of seeds that got there plus median and interquartile range over those.
+Fitness is bounded by the tick cap (--max-ticks): surviving to it is worth
+cap_fitness(max_ticks), plus one point per key. The default thresholds are
+25%, 50% and 100% of that.
+Runs with the same arguments are comparable across commits.
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+import numpy as np
+import src.common.settings as c
+from src.train import train
+from typing import Dict, List
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Measure generations and ticks to reach fitness targets.')
+    parser.add_argument('--seeds', '-m', type=int, default=10)
+    parser.add_argument('--first-seed', type=int, default=0)
+    parser.add_argument('--thresholds', type=float, nargs='+', default=None,
+                        help='fitness targets (default: 25%%, 50%% and 100%% of cap_fitness(max_ticks))')
+    parser.add_argument('--generations', '-g', type=int, default=c.MAX_GENERATIONS,
+                        help='generation cap per seed')
+    parser.add_argument('--population', '-p', type=int, default=c.POPULATION_SIZE)
+    parser.add_argument('--optimizer', choices=('ga', 'cmaes', 'nes'), default=c.OPTIMIZER)
+    parser.add_argument('--max-ticks', type=int, default=c.MAX_TICKS, help='tick cap per episode')
+    parser.add_argument('--output', '-o', default=None, help='write JSON here instead of stdout')
+    return parser.parse_args()
+
+
+def cap_fitness(max_ticks: int) -> float:
+    """Fitness of surviving up to the tick cap without collecting any key."""
+    norm_factor = c.WIDTH / c.OBSTACLE_SPEED / c.GAME_FPS
+    return round(c.FITNESS_WEIGHT_ALIVE * max_ticks / c.GAME_FPS / norm_factor, 3)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_seed(seed: int, thresholds: List[float], generations: int, population_size: int,
+             optimizer: str, max_ticks: int = c.MAX_TICKS) -> Dict:
+    """Trains one seed until every threshold is reached or the generation cap is hit."""
+    reached: Dict[str, Dict] = {}
+    totals = {'ticks': 0, 'best_fitness': -np.inf, 'generations': 0}
+    start_time = time.perf_counter()
+
+    def on_generation(generation: int, fitness: np.ndarray, time_alive: np.ndarray) -> bool:
+        totals['ticks'] += int(np.rint(time_alive * c.GAME_FPS).sum())
+        totals['best_fitness'] = max(totals['best_fitness'], float(fitness.max()))
+        totals['generations'] = generation
+        for threshold in thresholds:
+            if str(threshold) not in reached and totals['best_fitness'] >= threshold:
+                reached[str(threshold)] = {'generation': generation, 'ticks': totals['ticks'],
+                                           'seconds': time.perf_counter() - start_time}
+        return len(reached) == len(thresholds)
+
+    train(generations=generations, population_size=population_size, seed=seed, verbose=False,
+          optimizer=optimizer, callback=on_generation, max_ticks=max_ticks)
+    return {'seed': seed, 'reached': reached, 'generations': totals['generations'], 'ticks': totals['ticks'],
+            'best_fitness': totals['best_fitness'], 'seconds': time.perf_counter() - start_time}
+
+
+def summarize(values: List[float]) -> Dict[str, float] | None:
+    if not values:
+        return None
+    q1, median, q3 = np.percentile(values, [25, 50, 75])
+    return {'median': float(median), 'q1': float(q1), 'q3': float(q3), 'iqr': float(q3 - q1)}
+
+
+def main() -> None:
+    args = parse_args()
+    if args.thresholds is None:
+        args.thresholds = [round(fraction * cap_fitness(args.max_ticks), 3) for fraction in (0.25, 0.5, 1.0)]
+    results = []
+    for seed in range(args.first_seed, args.first_seed + args.seeds):
+        results.append(run_seed(seed, args.thresholds, args.generations, args.population, args.optimizer,
+                                args.max_ticks))
+        print(f"Seed {seed}: reached {sorted(results[-1]['reached'], key=float)} in "
+              f"{results[-1]['seconds']:.1f} s", file=sys.stderr)
+
+    summary = {}
+    for threshold in map(str, args.thresholds):
+        hits = [r['reached'][threshold] for r in results if threshold in r['reached']]
+        summary[threshold] = {'reached': len(hits), 'of': len(results),
+                              **{metric: summarize([hit[metric] for hit in hits])
+                                 for metric in ('generation', 'ticks', 'seconds')}}
+    report = {
+        'commit': git_commit(),
+        'config': {'seeds': list(range(args.first_seed, args.first_seed + args.seeds)),
+                   'thresholds': args.thresholds, 'max_generations': args.generations,
+                   'population': args.population, 'optimizer': args.optimizer, 'max_ticks': args.max_ticks},
+        'summary': summary,
+        'runs': results,
+        'wall_clock_seconds': sum(r['seconds'] for r in results),
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
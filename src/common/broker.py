@@ -0,0 +1,282 @@
+"""
+TCP broker and worker for distributed evaluation, plus a localhost self-check.
+Usage:
+    python -m src.common.broker [--population P] [--seeds M] [--workers N] [--max-ticks T]
+
+The self-check starts a broker and N worker processes (python -m src.worker) on
+localhost, evaluates random populations on M seeded courses through them, once
+more after one worker was killed, and compares every result with
+simulation.evaluate() in this process; they must be bit-identical. It also
+checks that evaluate() gives up with TimeoutError when no worker connects.
+"""
+import argparse
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+import queue
+import warnings
+import numpy as np
+from typing import List, Tuple
+from src.common.settings import BROKER_PORT, BROKER_BATCH_SIZE, BROKER_TIMEOUT, BROKER_IDLE_WARNING, BROKER_IDLE_DEADLINE, MAX_TICKS, GAME_FPS
+from src.common.evolution import GENOME_SIZE, flatten, unflatten
+from src.common.simulation import evaluate
+
+# Wire format: a fixed header followed by a raw little-endian array payload.
+#   WORK:     header(WORK, unit_id, seed, max_ticks, n) + n * GENOME_SIZE float64 genomes
+#   RESULT:   header(RESULT, unit_id, 0, 0, n) + n float64 fitness + n int32 ticks alive
+#   SHUTDOWN: header(SHUTDOWN, 0, 0, 0, 0)
+HEADER = struct.Struct('!BQqqI')
+WORK, RESULT, SHUTDOWN = 1, 2, 3
+
+
+def send_message(conn: socket.socket, kind: int, unit_id: int = 0, seed: int = 0, max_ticks: int = 0,
+                 n: int = 0, payload: bytes = b'') -> None:
+    conn.sendall(HEADER.pack(kind, unit_id, seed, max_ticks, n) + payload)
+
+
+def recv_exact(conn: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError('connection closed')
+        data.extend(chunk)
+    return bytes(data)
+
+
+def recv_message(conn: socket.socket) -> Tuple[int, int, int, int, int, bytes]:
+    kind, unit_id, seed, max_ticks, n = HEADER.unpack(recv_exact(conn, HEADER.size))
+    if kind == WORK:
+        payload = recv_exact(conn, n * GENOME_SIZE * 8)
+    elif kind == RESULT:
+        payload = recv_exact(conn, n * 12)
+    else:
+        payload = b''
+    return kind, unit_id, seed, max_ticks, n, payload
+
+
+class Job():
+    """One evaluate() call, split into work units of at most batch_size genomes."""
+
+    def __init__(self, genomes: np.ndarray, seed: int, max_ticks: int) -> None:
+        self.genomes = np.ascontiguousarray(genomes, dtype='<f8')
+        self.seed = seed
+        self.max_ticks = max_ticks
+        self.fitness = np.zeros(len(genomes))
+        self.ticks = np.zeros(len(genomes), dtype=np.int64)
+        self.done = np.zeros(len(genomes), dtype=bool)
+        self.remaining = 0
+        self.cancelled = False  # set when evaluate() gave up; its queued units are dropped
+        self.cond = threading.Condition()
+
+
+class Broker():
+    """Hands out (genome batch, course seed) work units to TCP workers.
+
+    Every connected worker gets a thread that pulls units from a shared queue.
+    If a worker disconnects or times out, its unit goes back on the queue and
+    is retried by another worker. Genomes are evaluated independently of each
+    other, so results are identical to a single-process Simulation run.
+
+    While no worker is connected, evaluate() warns after idle_warning seconds
+    and raises TimeoutError after idle_deadline seconds instead of waiting forever.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = BROKER_PORT, batch_size: int = BROKER_BATCH_SIZE,
+                 timeout: float = BROKER_TIMEOUT, idle_warning: float = BROKER_IDLE_WARNING,
+                 idle_deadline: float = BROKER_IDLE_DEADLINE) -> None:
+        self.host = host
+        self.port = port
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.idle_warning = idle_warning
+        self.idle_deadline = idle_deadline
+        self.units: queue.Queue = queue.Queue()
+        self.workers: List[socket.socket] = []
+        self.lock = threading.Lock()
+        self.running = False
+        self.server = None
+        self.next_unit_id = 0
+
+    def start(self) -> None:
+        self.server = socket.create_server((self.host, self.port))
+        self.port = self.server.getsockname()[1]  # resolves port 0
+        self.running = True
+        threading.Thread(target=self.accept_loop, daemon=True).start()
+
+    def accept_loop(self) -> None:
+        while self.running:
+            try:
+                conn, _ = self.server.accept()
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn.settimeout(self.timeout)
+            with self.lock:
+                self.workers.append(conn)
+            threading.Thread(target=self.serve_worker, args=(conn,), daemon=True).start()
+
+    def serve_worker(self, conn: socket.socket) -> None:
+        while self.running:
+            unit = self.units.get()
+            if unit is None:  # shutdown
+                break
+            job, unit_id, start, stop = unit
+            if job.cancelled:
+                continue
+            try:
+                send_message(conn, WORK, unit_id, job.seed, job.max_ticks, stop - start,
+                             job.genomes[start:stop].tobytes())
+                kind, result_id, _, _, n, payload = recv_message(conn)
+                if kind != RESULT or result_id != unit_id or n != stop - start:
+                    raise ConnectionError('unexpected reply')
+            except (OSError, ConnectionError, struct.error):
+                self.units.put(unit)  # retry on another worker
+                break
+            fitness = np.frombuffer(payload[:8 * n], dtype='<f8')
+            ticks = np.frombuffer(payload[8 * n:], dtype='<i4')
+            with job.cond:
+                if not job.done[start]:
+                    job.fitness[start:stop] = fitness
+                    job.ticks[start:stop] = ticks
+                    job.done[start:stop] = True
+                    job.remaining -= 1
+                    job.cond.notify_all()
+        with self.lock:
+            if conn in self.workers:
+                self.workers.remove(conn)
+        conn.close()
+
+    def n_workers(self) -> int:
+        with self.lock:
+            return len(self.workers)
+
+    def evaluate(self, weights_input: np.ndarray, weights_hidden: np.ndarray, seed: int,
+                 max_ticks: int = MAX_TICKS) -> Tuple[np.ndarray, np.ndarray]:
+        """Same as simulation.evaluate(), computed by the connected workers."""
+        job = Job(flatten(weights_input, weights_hidden), seed, max_ticks)
+        bounds = [(start, min(start + self.batch_size, len(job.genomes)))
+                  for start in range(0, len(job.genomes), self.batch_size)]
+        job.remaining = len(bounds)
+        for start, stop in bounds:
+            self.units.put((job, self.next_unit_id, start, stop))
+            self.next_unit_id += 1
+        idle_since = None  # since when no worker is connected
+        warned = False
+        with job.cond:
+            while not job.cond.wait_for(lambda: job.remaining == 0, timeout=min(1.0, self.idle_deadline)):
+                if self.n_workers() > 0:
+                    idle_since = None
+                    continue
+                now = time.perf_counter()
+                idle_since = now if idle_since is None else idle_since
+                if now - idle_since >= self.idle_deadline:
+                    job.cancelled = True
+                    raise TimeoutError(f"No worker connected to port {self.port} for {now - idle_since:.0f} s; "
+                                       f"{job.remaining} work units unfinished")
+                if now - idle_since >= self.idle_warning and not warned:
+                    warnings.warn(f"No worker connected to port {self.port} for {now - idle_since:.0f} s "
+                                  f"(start one with python -m src.worker --port {self.port})", RuntimeWarning)
+                    warned = True
+        return job.fitness, job.ticks / GAME_FPS
+
+    def close(self) -> None:
+        self.running = False
+        with self.lock:
+            workers = list(self.workers)
+        for _ in workers:
+            self.units.put(None)
+        for conn in workers:
+            try:
+                send_message(conn, SHUTDOWN)
+            except OSError:
+                pass
+        if self.server is not None:
+            self.server.close()
+
+
+def run_worker(host: str = '127.0.0.1', port: int = BROKER_PORT) -> int:
+    """Evaluates work units from a broker until it shuts down. Returns the number of units done."""
+    done = 0
+    with socket.create_connection((host, port)) as conn:
+        conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        while True:
+            try:
+                kind, unit_id, seed, max_ticks, n, payload = recv_message(conn)
+            except ConnectionError:
+                break
+            if kind != WORK:
+                break
+            genomes = np.frombuffer(payload, dtype='<f8').reshape(n, GENOME_SIZE)
+            weights_input, weights_hidden = unflatten(genomes)
+            fitness, time_alive = evaluate(weights_input, weights_hidden, seed=seed, max_ticks=max_ticks)
+            ticks = np.rint(time_alive * GAME_FPS).astype('<i4')
+            send_message(conn, RESULT, unit_id, n=n,
+                         payload=fitness.astype('<f8').tobytes() + ticks.tobytes())
+            done += 1
+    return done
+
+
+def self_check(population: int = 300, seeds: int = 3, workers: int = 2, max_ticks: int = 1200,
+               verbose: bool = True) -> bool:
+    """Broker results with local worker processes against simulation.evaluate(); True if all are identical."""
+    from src.common.evolution import random_weights
+    rng = np.random.RandomState(0)
+    broker = Broker(port=0, batch_size=max(population // (4 * workers), 1))
+    broker.start()
+    processes = [subprocess.Popen([sys.executable, '-m', 'src.worker', '--port', str(broker.port)],
+                                  stdout=subprocess.DEVNULL) for _ in range(workers)]
+    ok = True
+    try:
+        # the last round runs after one worker was killed, so its units are retried elsewhere
+        for round_ in range(seeds + (workers > 1)):
+            seed = round_ % seeds
+            weights_input, weights_hidden = (w * rng.choice([1, 5, 25], size=(population, 1, 1))
+                                             for w in random_weights(population, rng))
+            if round_ == seeds:
+                processes[0].kill()
+            fitness, time_alive = broker.evaluate(weights_input, weights_hidden, seed, max_ticks)
+            expected_fitness, expected_time_alive = evaluate(weights_input, weights_hidden, seed, max_ticks)
+            same = np.array_equal(fitness, expected_fitness) and np.array_equal(time_alive, expected_time_alive)
+            ok &= same
+            if verbose:
+                print(f"seed {seed}{' (one worker killed)' if round_ == seeds else ''}: "
+                      f"{'identical' if same else 'DIFFERENT'} to simulation.evaluate() "
+                      f"(best {expected_fitness.max():.3f}, {broker.n_workers()} workers)")
+    finally:
+        broker.close()
+        for process in processes:
+            process.wait(timeout=30)
+
+    idle = Broker(port=0, idle_warning=0.5, idle_deadline=1.0)
+    idle.start()
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            idle.evaluate(*random_weights(4, rng), seed=0, max_ticks=max_ticks)
+        ok = False
+        if verbose:
+            print("no workers: evaluate() returned instead of raising TimeoutError")
+    except TimeoutError as error:
+        if verbose:
+            print(f"no workers: {error}")
+    finally:
+        idle.close()
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check broker/worker evaluation against a local Simulation.')
+    parser.add_argument('--population', '-p', type=int, default=300)
+    parser.add_argument('--seeds', '-m', type=int, default=3)
+    parser.add_argument('--workers', '-w', type=int, default=2)
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS // 3)
+    args = parser.parse_args()
+    sys.exit(0 if self_check(args.population, args.seeds, args.workers, args.max_ticks) else 1)
+
+
+if __name__ == '__main__':
+    main()
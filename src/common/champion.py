@@ -0,0 +1,66 @@
+import json
+import numpy as np
+from pathlib import Path
+from typing import Dict, List
+import src.common.settings as c
+
+# Bump when the artifact layout changes; load() rejects newer versions.
+FORMAT_VERSION = 1
+# NN inputs in the order of Player.NN_jump
+FEATURES = ('y', 'vy', 'dx', 'dy_bottom', 'dy_top', 'dx_key', 'dy_key')
+# Settings the weights were trained under; the network is only meaningful with the same game physics.
+EXPORTED_SETTINGS = ('DECISION_THRESHOLD', 'GAME_FPS', 'GRAVITY', 'JUMP_FORCE', 'PLAYER_JUMP_COOLDOWN',
+                     'PLAYER_RADIUS', 'PLAYER_START_POS', 'OBSTACLE_SPEED', 'OBSTACLE_WIDTH', 'WIDTH', 'HEIGHT',
+                     'BASE_HEIGHT', 'FITNESS_WEIGHT_ALIVE', 'FITNESS_WEIGHT_KEYSCORE')
+
+
+def export_champion(path: str, weights_input: np.ndarray, weights_hidden: np.ndarray, fitness: float = 0.0,
+                    generation: int = 0) -> None:
+    """Writes a genome and the settings it was trained under to a versioned .npz file."""
+    settings = {name: getattr(c, name) for name in EXPORTED_SETTINGS}
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(path).with_suffix('.tmp.npz')
+    # written to a temporary file first, so readers never see a partial artifact
+    np.savez(tmp, version=FORMAT_VERSION, weights_input=np.asarray(weights_input, dtype=np.float64).reshape(7, 4),
+             weights_hidden=np.asarray(weights_hidden, dtype=np.float64).reshape(4, 1), fitness=fitness,
+             generation=generation, features=np.array(FEATURES), settings=json.dumps(settings))
+    tmp.replace(path)
+
+
+class Champion():
+    """A trained player's network, usable without pygame, a World or any training state.
+
+    predict() takes the seven inputs of Player.NN_update for any number of
+    players at once and returns their jump decisions.
+    """
+
+    def __init__(self, weights_input: np.ndarray, weights_hidden: np.ndarray, fitness: float = 0.0,
+                 generation: int = 0, settings: Dict | None = None) -> None:
+        self.weights_input = np.asarray(weights_input, dtype=np.float64)
+        self.weights_hidden = np.asarray(weights_hidden, dtype=np.float64)
+        self.fitness = fitness
+        self.generation = generation
+        self.settings = {name: getattr(c, name) for name in EXPORTED_SETTINGS} if settings is None else settings
+        self.threshold = self.settings.get('DECISION_THRESHOLD', c.DECISION_THRESHOLD)
+
+    @classmethod
+    def load(cls, path: str) -> 'Champion':
+        with np.load(path, allow_pickle=False) as data:
+            version = int(data['version'])
+            if version > FORMAT_VERSION:
+                raise ValueError(f"{path} has format version {version}, newer than supported {FORMAT_VERSION}")
+            return cls(data['weights_input'], data['weights_hidden'], fitness=float(data['fitness']),
+                       generation=int(data['generation']), settings=json.loads(str(data['settings'])))
+
+    def mismatched_settings(self) -> List[str]:
+        """Names of exported settings that differ from the current settings.py."""
+        return [name for name, value in self.settings.items()
+                if hasattr(c, name) and getattr(c, name) != value]
+
+    def predict(self, features: np.ndarray) -> np.ndarray:
+        """Jump decisions for features of shape (..., 7), as bools of shape (...)."""
+        features = np.asarray(features, dtype=np.float64)
+        with np.errstate(over='ignore'):
+            hidden = 1 / (1 + np.exp(-(features @ self.weights_input)))
+            prediction = 1 / (1 + np.exp(-(hidden @ self.weights_hidden)))
+        return prediction[..., 0] > self.threshold
@@ -0,0 +1,57 @@
+import numpy as np
+from pathlib import Path
+from typing import Dict
+from src.common.evolution import unflatten
+from src.common.hall_of_fame import HallOfFame
+from src.common.optimizers import Optimizer
+
+# Bump when the layout changes; load_checkpoint() rejects newer versions.
+# 1: genomes of the next generation and the hall of fame
+# 2: full optimizer state (Optimizer.state_dict), hall of fame reset history and rng state
+CHECKPOINT_VERSION = 2
+STATE_PREFIX = 'optimizer_state.'  # npz keys of the optimizer state entries
+
+
+def save_checkpoint(path: str, evolver: Optimizer, hall_of_fame: HallOfFame, generation: int,
+                    optimizer: str, rng: np.random.RandomState | None = None) -> None:
+    """Writes the optimizer state, the hall of fame and the rng state, atomically like export_champion()."""
+    n = len(hall_of_fame)
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    tmp = Path(path).with_suffix('.tmp.npz')
+    state = {STATE_PREFIX + key: value for key, value in evolver.state_dict().items()}
+    if rng is not None:
+        _, keys, pos, has_gauss, cached_gaussian = rng.get_state()
+        state.update(rng_keys=keys, rng_pos=pos, rng_has_gauss=has_gauss, rng_cached_gaussian=cached_gaussian)
+    np.savez(tmp, version=CHECKPOINT_VERSION, generation=generation, optimizer=optimizer,
+             hof_genomes=hall_of_fame.genomes[:n], hof_fitness=hall_of_fame.fitness[:n],
+             hof_generation=hall_of_fame.generation[:n], hof_genome_id=hall_of_fame.genome_id[:n],
+             hof_recent_times=np.array(hall_of_fame.recent_times, dtype=np.float64), **state)
+    tmp.replace(path)
+
+
+def load_checkpoint(path: str) -> Dict:
+    """generation, optimizer, a restored hall_of_fame and the optimizer_state of a save_checkpoint() file.
+
+    rng_state is None if none was saved. Version 1 files have genomes (the next population)
+    instead of an optimizer_state, which is then None.
+    """
+    with np.load(path, allow_pickle=False) as data:
+        version = int(data['version'])
+        if version > CHECKPOINT_VERSION:
+            raise ValueError(f"{path} has format version {version}, newer than supported {CHECKPOINT_VERSION}")
+        hall_of_fame = HallOfFame()
+        weights_input, weights_hidden = unflatten(data['hof_genomes'].astype(np.float64))
+        genome_ids = data['hof_genome_id'] if 'hof_genome_id' in data else np.full(len(weights_input), -1)
+        for iw, hw, fitness, generation, genome_id in zip(weights_input, weights_hidden, data['hof_fitness'],
+                                                          data['hof_generation'], genome_ids):
+            hall_of_fame.add(iw, hw, fitness=float(fitness), generation=int(generation), genome_id=int(genome_id))
+        if 'hof_recent_times' in data:
+            hall_of_fame.recent_times.extend(data['hof_recent_times'].tolist())
+        optimizer_state = {key[len(STATE_PREFIX):]: data[key] for key in data.files if key.startswith(STATE_PREFIX)}
+        rng_state = None
+        if 'rng_keys' in data:
+            rng_state = ('MT19937', data['rng_keys'], int(data['rng_pos']), int(data['rng_has_gauss']),
+                         float(data['rng_cached_gaussian']))
+        return {'genomes': data['genomes'] if 'genomes' in data else None, 'generation': int(data['generation']),
+                'optimizer': str(data['optimizer']), 'hall_of_fame': hall_of_fame,
+                'optimizer_state': optimizer_state or None, 'rng_state': rng_state}
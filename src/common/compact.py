@@ -0,0 +1,220 @@
+import numpy as np
+from typing import Tuple
+from src.common.settings import PLAYER_RADIUS, PLAYER_START_HEIGHT, PLAYER_START_POS, JUMP_FORCE, HEIGHT, BASE_HEIGHT, GRAVITY, GAME_FPS, DECISION_THRESHOLD, FITNESS_WEIGHT_ALIVE, FITNESS_WEIGHT_KEYSCORE, WIDTH, OBSTACLE_SPEED, OBSTACLE_SPACING, MAX_TICKS, MUTATION_CHANCE, MUTATION_SIZE, COMPACT_GENOME_DTYPE, COMPACT_BATCH_SIZE, SELECTION
+from src.common.evolution import GENOME_SIZE
+from src.common.selection import select_parents, truncation
+from src.common.kernel import JUMP_COOLDOWN_TICKS
+from src.common.simulation import sigmoid
+from src.common.world import World
+
+# Massive-population mode: no Player objects and no float64 population arrays.
+# Per individual, CompactSimulation keeps
+#   genome       32 B (int8) + 4 B float32 scale, or 64 B (float16)
+#   y, vy         8 B float32
+#   score, keys   4 B uint16
+#   death, jump   8 B int32 tick of death / last jump
+#   3 flags      3 bits packed (alive, has_key, passed)
+# i.e. ~57 B (int8) or ~85 B (float16). All float work happens on one batch of
+# batch_size individuals at a time, so temporaries don't grow with the population.
+# Peak traced memory at 1M individuals (int8, batch 65536, tracemalloc):
+#   ~93 B per individual while a generation is simulated (incl. fitness output),
+#   ~139 B per individual in next_generation_compact() (old and new genomes coexist),
+# i.e. under 150 MB for a million players, about 200 MB RSS with the interpreter.
+
+def quantize(genomes: np.ndarray, dtype: str = COMPACT_GENOME_DTYPE) -> Tuple[np.ndarray, np.ndarray | None]:
+    """(n, GENOME_SIZE) genomes as float16, or as int8 with one float32 scale per genome (None for float16)."""
+    if dtype == 'float16':
+        return genomes.astype(np.float16), None
+    if dtype != 'int8':
+        raise ValueError(f"Unknown genome dtype '{dtype}'; expected 'int8' or 'float16'")
+    scale = (np.abs(genomes).max(axis=-1) / 127).astype(np.float32)
+    scale[scale == 0] = 1
+    return np.rint(genomes / scale[:, None]).astype(np.int8), scale
+
+
+def dequantize(genomes: np.ndarray, scale: np.ndarray | None, dtype=np.float32) -> np.ndarray:
+    """Float genomes of a (batch) slice."""
+    if scale is None:
+        return genomes.astype(dtype)
+    return genomes.astype(dtype) * scale[:, None]
+
+
+def random_genomes(n: int, dtype: str = COMPACT_GENOME_DTYPE, rng=np.random,
+                   batch_size: int = COMPACT_BATCH_SIZE) -> Tuple[np.ndarray, np.ndarray | None]:
+    """Quantized counterpart of evolution.random_weights(), generated batch by batch."""
+    genomes = np.empty((n, GENOME_SIZE), dtype=np.float16 if dtype == 'float16' else np.int8)
+    scale = None if dtype == 'float16' else np.empty(n, dtype=np.float32)
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        q, s = quantize(rng.normal(0, 0.1, size=(stop - start, GENOME_SIZE)).astype(np.float32), dtype)
+        genomes[start:stop] = q
+        if scale is not None:
+            scale[start:stop] = s
+    return genomes, scale
+
+
+def next_generation_compact(genomes: np.ndarray, scale: np.ndarray | None, fitness: np.ndarray, rng=np.random,
+                            selection: str = SELECTION,
+                            batch_size: int = COMPACT_BATCH_SIZE) -> Tuple[np.ndarray, np.ndarray | None]:
+    """Crossover of selected parent pairs plus uniform mutation, batch by batch.
+
+    The compact stand-in for evolution.next_generation(): each batch draws its
+    parents with selection.select_parents() on the fitness array, averages them,
+    mutates (MUTATION_CHANCE, MUTATION_SIZE) and requantizes. The fittest genome
+    is carried over unchanged into slot 0.
+    """
+    n = len(genomes)
+    new_genomes = np.empty_like(genomes)
+    new_scale = None if scale is None else np.empty_like(scale)
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        parents = select_parents(fitness, (stop - start, 2), selection, rng)
+        a, b = parents[:, 0], parents[:, 1]
+        child = (dequantize(genomes[a], None if scale is None else scale[a]) +
+                 dequantize(genomes[b], None if scale is None else scale[b])) / 2
+        mask = rng.random_sample(child.shape) <= MUTATION_CHANCE
+        child += mask * (MUTATION_SIZE * rng.uniform(-0.25, 0.25, size=child.shape)).astype(np.float32)
+        q, s = quantize(child, 'float16' if scale is None else 'int8')
+        new_genomes[start:stop] = q
+        if new_scale is not None:
+            new_scale[start:stop] = s
+    best = truncation(fitness, 1)[0]
+    new_genomes[0] = genomes[best]
+    if new_scale is not None:
+        new_scale[0] = scale[best]
+    return new_genomes, new_scale
+
+
+class CompactSimulation():
+    """Memory-compact Simulation for populations of up to millions.
+
+    Same tick semantics as Simulation, but state is float32 / packed bits and
+    genomes are dequantized one batch at a time. Batches without live players
+    are skipped. Positions and velocities are multiples of 0.5, so float32
+    kinematics are exact: results equal Simulation run on the dequantized
+    weights. Key and gate state is per player as in Simulation; an open gate only
+    lets a player through while it also carries the key, so one bit covers both.
+    """
+
+    def __init__(self, genomes: np.ndarray, scale: np.ndarray | None, seed: int, max_ticks: int = MAX_TICKS,
+                 spacing: int = OBSTACLE_SPACING, batch_size: int = COMPACT_BATCH_SIZE) -> None:
+        n = len(genomes)
+        self.n = n
+        self.genomes = genomes
+        self.scale = scale
+        self.batch_size = batch_size - batch_size % 8  # batches start on whole bytes of the bit fields
+        self.world = World(rng=np.random.RandomState(seed), spacing=spacing)
+        self.max_ticks = max_ticks
+        self.tick = 0
+        self.x = PLAYER_START_POS
+        self.y = np.full(n, PLAYER_START_HEIGHT, dtype=np.float32)
+        self.vy = np.zeros(n, dtype=np.float32)
+        self.score = np.zeros(n, dtype=np.uint16)
+        self.keyscore = np.zeros(n, dtype=np.uint16)
+        self.death_tick = np.zeros(n, dtype=np.int32)  # ticks survived by dead players
+        self.jump_tick = np.zeros(n, dtype=np.int32)  # tick of the last jump
+        n_bytes = (n + 7) // 8
+        self.alive_bits = np.packbits(np.ones(n, dtype=bool))
+        self.key_bits = np.zeros(n_bytes, dtype=np.uint8)
+        self.passed_bits = np.zeros(n_bytes, dtype=np.uint8)
+
+    def step(self) -> bool:
+        """Advances one tick. Returns False once every player is dead or the tick cap is hit."""
+        if self.world.update():
+            self.passed_bits[:] = 0
+        obstacle, _, key = self.world.upcoming()
+        if self.x >= obstacle.x + obstacle.width:
+            self.key_bits[:] = 0
+        for start in range(0, self.n, self.batch_size):
+            stop = min(start + self.batch_size, self.n)
+            if self.alive_bits[start // 8:(stop + 7) // 8].any():
+                self.step_batch(start, stop, obstacle, key)
+        self.tick += 1
+        return bool(self.alive_bits.any()) and self.tick < self.max_ticks
+
+    def step_batch(self, start: int, stop: int, obstacle, key) -> None:
+        b = slice(start, stop)
+        bytes_ = slice(start // 8, (stop + 7) // 8)
+        count = stop - start
+        alive = np.unpackbits(self.alive_bits[bytes_], count=count).astype(bool)
+        has_key = np.unpackbits(self.key_bits[bytes_], count=count).astype(bool)
+        passed = np.unpackbits(self.passed_bits[bytes_], count=count).astype(bool)
+        y, vy = self.y[b], self.vy[b]  # views, updated in place
+
+        # - Features (Player.NN_update) and decision (Player.NN_jump), for players able to jump only -
+        ready = np.flatnonzero(alive & (self.tick - self.jump_tick[b] >= JUMP_COOLDOWN_TICKS))
+        ready_y, ready_key = y[ready], has_key[ready]
+        features = np.empty((len(ready), 7))
+        features[:, 0] = ready_y
+        features[:, 1] = vy[ready]
+        features[:, 2] = obstacle.x - self.x
+        if obstacle.category == 'bottom':
+            features[:, 3] = obstacle.y - ready_y
+            features[:, 4] = ready_y - BASE_HEIGHT
+        else:
+            features[:, 3] = HEIGHT - BASE_HEIGHT - ready_y
+            features[:, 4] = obstacle.y - ready_y
+        features[:, 5] = np.where(ready_key, 0, self.x - max(key.x, min(self.x, key.x + key.size)))
+        features[:, 6] = np.where(ready_key, 0, ready_y - np.maximum(key.y, np.minimum(ready_y, key.y + key.size)))
+        # float64 like Simulation: in float32 the sigmoids saturate to exactly 0 / 0.5 much sooner
+        rows = start + ready
+        weights = dequantize(self.genomes[rows], None if self.scale is None else self.scale[rows], np.float64)
+        with np.errstate(over='ignore'):
+            hidden = sigmoid(np.einsum('ni,nij->nj', features, weights[:, :28].reshape(-1, 7, 4)))
+            decision = sigmoid(np.einsum('nj,nj->n', hidden, weights[:, 28:])) > DECISION_THRESHOLD
+        jumped = np.zeros(count, dtype=bool)
+        jumped[ready[decision]] = True
+        vy[jumped] = JUMP_FORCE
+        self.jump_tick[b][jumped] = self.tick
+
+        # - Ground collision, gravity and kinematics -
+        ground = HEIGHT - BASE_HEIGHT - PLAYER_RADIUS
+        on_ground = (y >= ground) & (vy >= 0)
+        y[on_ground] = ground
+        vy[on_ground] = 0
+        vy[~on_ground] += GRAVITY
+        y += vy
+        # - Scoring -
+        if self.x >= obstacle.x + obstacle.width:
+            scored = alive & ~passed
+            self.score[b] += scored
+            passed |= scored
+        # - Key touch event -
+        dx_key = self.x - max(key.x, min(self.x, key.x + key.size))
+        dy_key = y - np.maximum(key.y, np.minimum(y, key.y + key.size))
+        touching = alive & ~has_key & (dx_key**2 + dy_key**2 <= PLAYER_RADIUS**2)
+        self.keyscore[b] += touching
+        has_key |= touching
+        # - Obstacle / locked gate touch event -
+        dx = np.where(has_key, self.x - max(obstacle.x, min(self.x, obstacle.x + obstacle.width)), obstacle.x - self.x)
+        if obstacle.category == 'bottom':
+            top, bottom = obstacle.y, obstacle.y + obstacle.height
+        else:
+            top, bottom = obstacle.y - obstacle.height, obstacle.y
+        dy = np.where(has_key, y - np.maximum(top, np.minimum(y, bottom)), 0)
+        colliding = alive & ((dx**2 + dy**2 <= PLAYER_RADIUS**2) | (y - PLAYER_RADIUS <= BASE_HEIGHT) |
+                             (y + PLAYER_RADIUS >= HEIGHT - BASE_HEIGHT))
+        self.death_tick[b][colliding] = self.tick + 1
+        alive &= ~colliding
+
+        self.alive_bits[bytes_] = np.packbits(alive)
+        self.key_bits[bytes_] = np.packbits(has_key)
+        self.passed_bits[bytes_] = np.packbits(passed)
+
+    def run(self) -> np.ndarray:
+        while self.step():
+            pass
+        return self.fitness()
+
+    def ticks(self) -> np.ndarray:
+        alive = np.unpackbits(self.alive_bits, count=self.n).astype(bool)
+        return np.where(alive, np.int32(self.tick), self.death_tick)
+
+    def time_alive(self) -> np.ndarray:
+        return self.ticks() / GAME_FPS
+
+    def fitness(self) -> np.ndarray:
+        """Simulation.fitness(), returned as float32."""
+        norm_factor = WIDTH / OBSTACLE_SPEED / GAME_FPS
+        return np.round(FITNESS_WEIGHT_ALIVE * self.time_alive() / norm_factor +
+                        FITNESS_WEIGHT_KEYSCORE * self.keyscore, 3).astype(np.float32)
@@ -0,0 +1,130 @@
+import warnings
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Tuple
+from src.common.settings import HUMAN_PLAY_FILE, DECISION_THRESHOLD, MUTATION_SIZE
+from src.common.evolution import flatten, mutate
+
+FIT_MAX_SAMPLES = 20_000  # ticks used for fitting, subsampled from longer logs
+FIT_MARGIN = 2.0  # target distance of the output logit from the decision threshold
+FIT_RIDGE = 1e-3
+FIT_CANDIDATES = 64  # networks actually fitted; the rest of the population are mutated copies
+FIT_CHUNK_SIZE = 8  # candidates fitted at once: (chunk, samples, 4) float64 temporaries, ~5 MB each
+
+
+class PlayRecorder():
+    """Per-tick NN inputs (Player.features) and SPACE presses of the human player.
+
+    Features are stored as float32 and presses as one bit per tick. Each life is
+    one episode. An existing log at path is extended, not overwritten.
+    """
+
+    def __init__(self, path: str = HUMAN_PLAY_FILE) -> None:
+        self.path = path
+        self.features: List[List[float]] = []
+        self.presses: List[bool] = []
+        self.episode_ends: List[int] = []
+        self.previous = load_play_log(path) if Path(path).exists() else None
+
+    def record(self, features: List[float], pressed: bool) -> None:
+        self.features.append(features)
+        self.presses.append(pressed)
+
+    def end_episode(self) -> None:
+        if len(self.presses) > (self.episode_ends[-1] if self.episode_ends else 0):
+            self.episode_ends.append(len(self.presses))
+            self.save()
+
+    def save(self) -> None:
+        features = np.array(self.features, dtype=np.float32).reshape(-1, 7)
+        presses = np.array(self.presses, dtype=bool)
+        offsets = np.array([0] + self.episode_ends, dtype=np.int64)
+        if self.previous is not None:
+            features = np.concatenate([self.previous['features'], features])
+            presses = np.concatenate([self.previous['presses'], presses])
+            offsets = np.concatenate([self.previous['offsets'], self.previous['offsets'][-1] + offsets[1:]])
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(self.path, features=features, presses=np.packbits(presses), n_ticks=len(presses),
+                            offsets=offsets)
+
+
+def load_play_log(path: str) -> Dict[str, np.ndarray]:
+    """Features (n, 7), presses (n,) bools and episode offsets of a PlayRecorder log."""
+    with np.load(path) as data:
+        n = int(data['n_ticks'])
+        return {'features': data['features'], 'presses': np.unpackbits(data['presses'])[:n].astype(bool),
+                'offsets': data['offsets']}
+
+
+def sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+def fit_hidden_weights(X: np.ndarray, y: np.ndarray,
+                       weights_input: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Least-squares hidden weights (m, 4, 1) for given input weights (m, 7, 4), and their balanced accuracy."""
+    with np.errstate(over='ignore'):
+        hidden = sigmoid(np.einsum('ti,nij->ntj', X, weights_input))  # (m, T, 4)
+    threshold = np.log(DECISION_THRESHOLD / (1 - DECISION_THRESHOLD))
+    target = threshold + np.where(y, FIT_MARGIN, -FIT_MARGIN)
+    sample_weight = np.where(y, 0.5 / y.sum(), 0.5 / (~y).sum())
+    A = np.einsum('ntj,t,ntk->njk', hidden, sample_weight, hidden) + FIT_RIDGE * np.eye(4)
+    b = np.einsum('ntj,t->nj', hidden, sample_weight * target)
+    weights_hidden = np.linalg.solve(A, b[..., None])
+
+    predicted = (hidden @ weights_hidden)[..., 0] > threshold
+    accuracy = (predicted[:, y].mean(axis=1) + (~predicted[:, ~y]).mean(axis=1)) / 2
+    return weights_hidden, accuracy
+
+
+def fit_population(features: np.ndarray, presses: np.ndarray, n: int, rng=np.random) -> Tuple[np.ndarray, np.ndarray]:
+    """Weights of n networks imitating recorded play, best fits first.
+
+    Up to FIT_CANDIDATES candidates get random input weights, scaled to the
+    spread of the features so hidden units don't saturate. Their hidden weights
+    are then the class-balanced ridge least-squares fit of the output logit to
+    threshold +- FIT_MARGIN (jump / no jump), solved from batched 4 x 4 normal
+    equations, FIT_CHUNK_SIZE candidates at a time so memory does not grow with
+    n. The better half by balanced accuracy is kept (at most half of n), and the
+    rest of the population are mutated copies of it. Mutations are relative to
+    the fitted weights: input weights mutate in units of the feature spread,
+    hidden weights by MUTATION_SIZE times their mean magnitude, so the copies
+    vary the fit instead of drowning it.
+    """
+    X = np.asarray(features, dtype=np.float64)
+    y = np.asarray(presses, dtype=bool)
+    if y.all() or not y.any():
+        raise ValueError('recorded play needs both jump and no-jump ticks')
+    if len(y) > FIT_MAX_SAMPLES:
+        keep = rng.choice(len(y), FIT_MAX_SAMPLES, replace=False)
+        X, y = X[keep], y[keep]
+    m = min(n, FIT_CANDIDATES)
+    scale = X.std(axis=0) + 1e-9
+    candidates_input = rng.standard_normal((m, 7, 4)) / (scale[None, :, None] * np.sqrt(7))
+    candidates_hidden = np.empty((m, 4, 1))
+    accuracy = np.empty(m)
+    for start in range(0, m, FIT_CHUNK_SIZE):
+        chunk = slice(start, min(start + FIT_CHUNK_SIZE, m))
+        candidates_hidden[chunk], accuracy[chunk] = fit_hidden_weights(X, y, candidates_input[chunk])
+
+    n_keep = min((m + 1) // 2, (n + 1) // 2)
+    best = np.argsort(-accuracy, kind='stable')[:n_keep]
+    weights_input, weights_hidden = np.empty((n, 7, 4)), np.empty((n, 4, 1))
+    weights_input[:n_keep], weights_hidden[:n_keep] = candidates_input[best], candidates_hidden[best]
+    parents = rng.randint(n_keep, size=n - n_keep)
+    weights_input[n_keep:] = mutate(weights_input[parents] * scale[:, None], rng) / scale[:, None]
+    weights_hidden[n_keep:] = mutate(weights_hidden[parents], rng,
+                                     MUTATION_SIZE * np.abs(weights_hidden[parents]).mean(axis=(1, 2)))
+    return weights_input, weights_hidden
+
+
+def warm_start_genomes(n: int, path: str = HUMAN_PLAY_FILE, rng=np.random) -> np.ndarray | None:
+    """Flattened fit_population() genomes for a recorded play log, None if there is none or it cannot be fitted."""
+    if not Path(path).exists():
+        return None
+    log = load_play_log(path)
+    try:
+        return flatten(*fit_population(log['features'], log['presses'], n, rng))
+    except ValueError as error:
+        warnings.warn(f"Cannot warm-start from {path} ({error}), using random weights", RuntimeWarning)
+        return None
@@ -0,0 +1,161 @@
+import numpy as np
+from collections import deque
+from typing import Tuple
+from src.common.selection import truncation, select_parents
+from src.common.lineage import CROSSOVER, CROSS_GENERATION, CLONE, RESET, NO_PARENT, BEST_OVERALL
+from src.common.settings import MUTATION_CHANCE, MUTATION_SIZE, SELECTION, CROSSOVER_RATE, CROSS_GENERATION_RATE, STEP_SIZE_TAU, STEP_SIZE_BOUNDS, SUCCESS_RULE_WINDOW, SUCCESS_RULE_FACTOR
+
+
+GENOME_SIZE = 7 * 4 + 4 * 1  # input and hidden layer weights
+
+
+def flatten(weights_input: np.ndarray, weights_hidden: np.ndarray, step_sizes: np.ndarray | None = None) -> np.ndarray:
+    """Packs (..., 7, 4) and (..., 4, 1) weights into (..., GENOME_SIZE) genomes.
+
+    Self-adaptive step sizes of shape (...) are stored alongside the weights as an
+    extra trailing column, giving (..., GENOME_SIZE + 1) genomes.
+    """
+    lead = weights_input.shape[:-2]
+    parts = [weights_input.reshape(*lead, 28), weights_hidden.reshape(*lead, 4)]
+    if step_sizes is not None:
+        parts.append(np.reshape(step_sizes, (*lead, 1)))
+    return np.concatenate(parts, axis=-1)
+
+
+def unflatten(genomes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of flatten(), ignoring a step size column."""
+    lead = genomes.shape[:-1]
+    return genomes[..., :28].reshape(*lead, 7, 4), genomes[..., 28:GENOME_SIZE].reshape(*lead, 4, 1)
+
+
+def random_weights(n: int, rng=np.random) -> Tuple[np.ndarray, np.ndarray]:
+    """Fresh genomes, initialized like Player.__init__."""
+    return rng.normal(0, 0.1, size=(n, 7, 4)), rng.normal(0, 0.1, size=(n, 4, 1))
+
+
+def mutate(weights: np.ndarray, rng=np.random, step_sizes: np.ndarray | float = MUTATION_SIZE) -> np.ndarray:
+    """Uniform mutation: each weight changes with MUTATION_CHANCE by step_size * U(-0.25, 0.25).
+
+    step_sizes is either one value for all genomes or one per genome, shape (n,).
+    """
+    mask = rng.random_sample(weights.shape) <= MUTATION_CHANCE
+    step = np.reshape(step_sizes, np.shape(step_sizes) + (1,) * (weights.ndim - np.ndim(step_sizes)))
+    return weights + mask * step * rng.uniform(-0.25, 0.25, size=weights.shape)
+
+
+def adapt_step_sizes(step_sizes: np.ndarray, rng=np.random) -> np.ndarray:
+    """Log-normal self-adaptation: sigma' = sigma * exp(STEP_SIZE_TAU * N(0, 1)), within STEP_SIZE_BOUNDS.
+
+    The step size is mutated before the weights it applies to, so offspring whose
+    step size suits the current stage of training are the ones selected.
+    """
+    return np.clip(step_sizes * np.exp(STEP_SIZE_TAU * rng.standard_normal(np.shape(step_sizes))), *STEP_SIZE_BOUNDS)
+
+
+class SuccessRule():
+    """Rechenberg's 1/5th success rule as a population-level step size multiplier.
+
+    A generation is a success if it improves on the best fitness so far. Every
+    `window` generations, the multiplier grows by 1/factor if more than a fifth of
+    them were successful and shrinks by factor if fewer were. It stays within
+    `bounds`, by default the range that maps MUTATION_SIZE onto STEP_SIZE_BOUNDS,
+    so it can recover in a few windows after long stagnation.
+    """
+
+    def __init__(self, window: int = SUCCESS_RULE_WINDOW, factor: float = SUCCESS_RULE_FACTOR,
+                 bounds: tuple = (STEP_SIZE_BOUNDS[0] / MUTATION_SIZE, STEP_SIZE_BOUNDS[1] / MUTATION_SIZE)) -> None:
+        self.successes: deque = deque(maxlen=window)
+        self.factor = factor
+        self.bounds = bounds
+        self.scale = 1.0
+
+    def update(self, success: bool) -> float:
+        self.successes.append(success)
+        if len(self.successes) == self.successes.maxlen:
+            rate = sum(self.successes) / len(self.successes)
+            if rate > 0.2:
+                self.scale /= self.factor
+            elif rate < 0.2:
+                self.scale *= self.factor
+            self.scale = float(np.clip(self.scale, *self.bounds))
+            self.successes.clear()
+        return self.scale
+
+
+def next_generation(weights_input: np.ndarray, weights_hidden: np.ndarray, fitness: np.ndarray,
+                    best_overall_iw: np.ndarray, best_overall_hw: np.ndarray, reset_population: bool = False,
+                    rng=np.random, step_sizes: np.ndarray | None = None, best_overall_step: float = MUTATION_SIZE,
+                    scale: float = 1.0, selection: str = SELECTION,
+                    origin: np.ndarray | None = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray | None]:
+    """Creates the weights of the next generation.
+
+    Args:
+        weights_input, weights_hidden: Population weights of shape (n, 7, 4) and (n, 4, 1),
+            in any order.
+        fitness: Fitness of shape (n,), in population order. Crossover parents are picked from it
+            by selection.select_parents(selection), the generation's best by selection.truncation().
+        best_overall_iw, best_overall_hw: Weights of the best player over all generations.
+        reset_population (bool): Re-initialize the cloning share of the population with
+            random weights instead of cloning the best overall player.
+        step_sizes: Self-adaptive step sizes of shape (n,), in population order. Children inherit
+            the (mean) step size of their parents, adapted by adapt_step_sizes(). None uses
+            MUTATION_SIZE for everyone.
+        best_overall_step (float): Step size of the best overall player.
+        scale (float): Multiplier on all step sizes, e.g. SuccessRule.scale. The scaled step sizes
+            are clipped to STEP_SIZE_BOUNDS.
+        origin: Optional (n, 3) integer array, filled with each child's lineage operator and
+            the population indices of its two parents (lineage.BEST_OVERALL for the best
+            overall player, lineage.NO_PARENT if none).
+
+    Returns:
+        The new input and hidden weights, split into standard crossover, cross-generation
+        crossover and cloning/resetting by CROSSOVER_RATE and CROSS_GENERATION_RATE, and the
+        new step sizes (None without step_sizes).
+    """
+    n = len(weights_input)
+    best = truncation(fitness, 1)[0]
+    n_cross = int(n * CROSSOVER_RATE)
+    n_cross_gen = int(n * (CROSS_GENERATION_RATE + CROSSOVER_RATE)) - n_cross
+    n_clone = n - n_cross - n_cross_gen
+    new_iw = np.empty_like(weights_input)
+    new_hw = np.empty_like(weights_hidden)
+    new_steps = None if step_sizes is None else np.full(n, float(MUTATION_SIZE))
+
+    def block_steps(block: slice, inherited) -> np.ndarray | float:
+        # mutation step sizes of a block of children: adapted from their parents, then scaled,
+        # then bounded, so a shrinking success rule scale can't take them below STEP_SIZE_BOUNDS
+        if new_steps is None:
+            return float(np.clip(MUTATION_SIZE * scale, *STEP_SIZE_BOUNDS))
+        new_steps[block] = adapt_step_sizes(np.broadcast_to(inherited, new_steps[block].shape), rng)
+        return np.clip(new_steps[block] * scale, *STEP_SIZE_BOUNDS)
+
+    # - Standard crossover of selected parent pairs -
+    if n_cross > 0:
+        block = slice(0, n_cross)
+        parents = select_parents(fitness, (n_cross, 2), selection, rng)
+        step = block_steps(block, None if step_sizes is None else step_sizes[parents].mean(axis=1))
+        for w, new_w in ((weights_input, new_iw), (weights_hidden, new_hw)):
+            new_w[block] = mutate((w[parents[:, 0]] + w[parents[:, 1]]) / 2, rng, step)
+        if origin is not None:
+            origin[block, 0] = CROSSOVER
+            origin[block, 1:] = parents
+
+    # - Cross-generation crossover -
+    block = slice(n_cross, n_cross + n_cross_gen)
+    step = block_steps(block, None if step_sizes is None else (step_sizes[best] + best_overall_step) / 2)
+    new_iw[block] = mutate(np.broadcast_to((weights_input[best] + best_overall_iw) / 2, new_iw[block].shape), rng, step)
+    new_hw[block] = mutate(np.broadcast_to((weights_hidden[best] + best_overall_hw) / 2, new_hw[block].shape), rng, step)
+    if origin is not None:
+        origin[block] = (CROSS_GENERATION, best, BEST_OVERALL)
+
+    # - Cloning or Resetting -
+    block = slice(n - n_clone, n)
+    if reset_population:
+        new_iw[block], new_hw[block] = random_weights(n_clone, rng)
+    else:
+        step = block_steps(block, best_overall_step)
+        new_iw[block] = mutate(np.broadcast_to(best_overall_iw, new_iw[block].shape), rng, step)
+        new_hw[block] = mutate(np.broadcast_to(best_overall_hw, new_hw[block].shape), rng, step)
+    if origin is not None:
+        origin[block] = (RESET, NO_PARENT, NO_PARENT) if reset_population else (CLONE, BEST_OVERALL, NO_PARENT)
+    return new_iw, new_hw, new_steps
@@ -0,0 +1,84 @@
+import heapq
+import numpy as np
+from collections import deque
+from typing import Dict, List, Tuple
+from src.common.settings import HALL_OF_FAME_SIZE, HALL_OF_FAME_DTYPE, RESET_THRESHOLD
+from src.common.evolution import GENOME_SIZE, flatten, unflatten
+
+
+class HallOfFame():
+    """Bounded archive of the k best distinct genomes seen so far.
+
+    Genomes live in one preallocated (k, GENOME_SIZE) array of float32 or
+    float16. A min-heap of (fitness, slot) pairs finds the entry to evict in
+    O(log k), the best slot is tracked on insert for O(1) lookup, and a set of
+    genome bytes rejects duplicates. It replaces the ever-growing per-generation
+    lists of weights that main.py used to search with max() and index().
+    """
+
+    def __init__(self, k: int = HALL_OF_FAME_SIZE, dtype: str = HALL_OF_FAME_DTYPE) -> None:
+        self.k = k
+        self.genomes = np.zeros((k, GENOME_SIZE), dtype=dtype)
+        self.fitness = np.full(k, -np.inf)
+        self.generation = np.zeros(k, dtype=np.int64)
+        self.genome_id = np.full(k, -1, dtype=np.int64)  # lineage.Lineage ID, -1 if untracked
+        self.heap: List[Tuple[float, int]] = []  # (fitness, slot), weakest entry first
+        self.keys: Dict[bytes, int] = {}  # genome bytes -> slot, for duplicate detection
+        self.best_slot = -1
+        # best time alive of the last RESET_THRESHOLD generations, for the population reset rule
+        self.recent_times = deque(maxlen=RESET_THRESHOLD)
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def add(self, weights_input: np.ndarray, weights_hidden: np.ndarray, fitness: float, generation: int = 0,
+            genome_id: int = -1) -> bool:
+        """Inserts a genome if it is new and beats the weakest entry. Returns True if stored."""
+        genome = flatten(weights_input, weights_hidden).astype(self.genomes.dtype)
+        key = genome.tobytes()
+        if key in self.keys:
+            return False
+        if len(self.heap) < self.k:
+            slot = len(self.heap)
+            heapq.heappush(self.heap, (fitness, slot))
+        elif fitness > self.heap[0][0]:
+            _, slot = heapq.heapreplace(self.heap, (fitness, self.heap[0][1]))
+            del self.keys[self.genomes[slot].tobytes()]
+        else:
+            return False
+        self.genomes[slot] = genome
+        self.fitness[slot] = fitness
+        self.generation[slot] = generation
+        self.genome_id[slot] = genome_id
+        self.keys[key] = slot
+        if self.best_slot < 0 or fitness > self.fitness[self.best_slot] or self.best_slot == slot:
+            self.best_slot = slot
+        return True
+
+    @property
+    def best_fitness(self) -> float:
+        return self.fitness[self.best_slot] if self.best_slot >= 0 else -np.inf
+
+    @property
+    def best_id(self) -> int:
+        return int(self.genome_id[self.best_slot]) if self.best_slot >= 0 else -1
+
+    def best(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Input and hidden weights (float64) of the best genome."""
+        iw, hw = unflatten(self.genomes[self.best_slot].astype(np.float64))
+        return iw.copy(), hw.copy()
+
+    def top(self, n: int | None = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Weights and fitness of the n best genomes, best first."""
+        slots = np.argsort(-self.fitness[:len(self.heap)], kind='stable')[:n]
+        iw, hw = unflatten(self.genomes[slots].astype(np.float64))
+        return iw, hw, self.fitness[slots]
+
+    def end_generation(self, best_time_alive: float) -> None:
+        self.recent_times.append(best_time_alive)
+
+    def should_reset(self, generation: int) -> bool:
+        """Reset rule of main.py: every RESET_THRESHOLD generations, if the best
+        time alive is worse than RESET_THRESHOLD generations ago."""
+        return (generation % RESET_THRESHOLD == 0) and len(self.recent_times) == RESET_THRESHOLD and (
+            self.recent_times[0] > self.recent_times[-1])
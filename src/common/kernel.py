@@ -0,0 +1,330 @@
+"""
+Fused per-tick kernels for Simulation, plus a self-check against Player.
+Usage:
+    python -m src.common.kernel [--population P] [--seeds M] [--max-ticks T]
+
+One tick of Simulation chains feature extraction (Player.NN_update), the
+forward pass (NN_jump), jumping and gravity (update / jump), scoring, key
+pickup (is_touching) and collision (is_colliding). With numba installed,
+NumbaKernel does all of it in a single compiled loop over the players, one
+pass over memory per tick. Otherwise NumpyKernel runs the same NumPy
+operations as before, but into buffers allocated once per Simulation instead
+of fresh temporaries every tick.
+
+The self-check steps Player objects (tick-based cooldown, as in replays)
+next to Simulation with every available kernel and reports any player whose
+ticks, score, keyscore or final position differ.
+"""
+import argparse
+import sys
+import numpy as np
+from src.common.settings import PLAYER_RADIUS, PLAYER_JUMP_COOLDOWN, JUMP_FORCE, HEIGHT, BASE_HEIGHT, GRAVITY, DECISION_THRESHOLD, KERNEL, MAX_TICKS
+try:
+    import numba
+except ImportError:  # optional; falls back to NumpyKernel
+    numba = None
+
+# PLAYER_JUMP_COOLDOWN is defined at 60 FPS, see Player.jump()
+JUMP_COOLDOWN_TICKS = PLAYER_JUMP_COOLDOWN * 60
+GROUND = HEIGHT - BASE_HEIGHT - PLAYER_RADIUS
+
+
+class NumpyKernel():
+    """Simulation.step's vectorized tick with every temporary preallocated (out=, copyto, in-place ops)."""
+
+    name = 'numpy'
+
+    def __init__(self, weights_input: np.ndarray, weights_hidden: np.ndarray) -> None:
+        n = len(weights_input)
+        self.weights_input = weights_input
+        self.weights_hidden = weights_hidden
+        self.features = np.empty((n, 7))
+        self.hidden = np.empty((n, 4))
+        self.prediction = np.empty((n, 1))
+        self.a = np.empty(n)
+        self.b = np.empty(n)
+        self.mask = np.empty(n, dtype=bool)
+        self.mask2 = np.empty(n, dtype=bool)
+        self.since_jump = np.empty(n, dtype=np.int64)
+
+    def step(self, sim, obstacle, key) -> None:
+        y, vy, alive, mask, mask2, a, b = sim.y, sim.vy, sim.is_alive, self.mask, self.mask2, self.a, self.b
+        past = sim.x >= obstacle.x + obstacle.width
+        if past:
+            sim.has_key[:] = False
+        # - Features (Player.NN_update) -
+        features = self.features
+        features[:, 0] = y
+        features[:, 1] = vy
+        features[:, 2] = obstacle.x - sim.x
+        if obstacle.category == 'bottom':
+            np.subtract(obstacle.y, y, out=features[:, 3])
+            np.subtract(y, BASE_HEIGHT, out=features[:, 4])
+        else:
+            np.subtract(HEIGHT - BASE_HEIGHT, y, out=features[:, 3])
+            np.subtract(obstacle.y, y, out=features[:, 4])
+        features[:, 5] = sim.x - max(key.x, min(sim.x, key.x + key.size))
+        np.minimum(y, key.y + key.size, out=a)
+        np.maximum(a, key.y, out=a)
+        np.subtract(y, a, out=features[:, 6])
+        np.copyto(features[:, 5], 0, where=sim.has_key)
+        np.copyto(features[:, 6], 0, where=sim.has_key)
+        # - Forward pass (Player.NN_jump) -
+        with np.errstate(over='ignore'):
+            np.einsum('ni,nij->nj', features, self.weights_input, out=self.hidden)
+            sigmoid_(self.hidden)
+            np.einsum('nj,njk->nk', self.hidden, self.weights_hidden, out=self.prediction)
+            sigmoid_(self.prediction)
+        # - Jumping (Player.update / Player.jump) -
+        jumped = sim.jumped
+        np.greater(self.prediction[:, 0], DECISION_THRESHOLD, out=jumped)
+        jumped &= alive
+        np.subtract(sim.tick, sim.jump_tick, out=self.since_jump)
+        np.greater_equal(self.since_jump, JUMP_COOLDOWN_TICKS, out=mask)
+        jumped &= mask
+        np.copyto(vy, JUMP_FORCE, where=jumped)
+        np.copyto(sim.jump_tick, sim.tick, where=jumped)
+        # - Ground collision, gravity and kinematics -
+        np.greater_equal(y, GROUND, out=mask)
+        np.greater_equal(vy, 0, out=mask2)
+        mask &= mask2
+        np.copyto(y, GROUND, where=mask)
+        vy += GRAVITY
+        np.copyto(vy, 0, where=mask)
+        y += vy
+        sim.ticks += alive
+        # - Scoring -
+        if past:
+            np.logical_not(sim.passed, out=mask)
+            mask &= alive
+            sim.score += mask
+            sim.passed |= mask
+        # - Key touch event (Player.is_touching / collect_key) -
+        np.minimum(y, key.y + key.size, out=a)
+        np.maximum(a, key.y, out=a)
+        np.subtract(y, a, out=a)
+        np.square(a, out=a)
+        a += (sim.x - max(key.x, min(sim.x, key.x + key.size)))**2
+        np.less_equal(a, PLAYER_RADIUS**2, out=mask)
+        np.logical_not(sim.has_key, out=mask2)
+        mask &= mask2
+        mask &= alive
+        sim.keyscore += mask
+        sim.has_key |= mask
+        sim.key_collected |= mask
+        sim.gate_open |= mask
+        # - Obstacle / locked gate touch event (Player.is_colliding) -
+        unlocked = np.logical_and(sim.gate_open, sim.has_key, out=mask2)
+        if obstacle.category == 'bottom':
+            top, bottom = obstacle.y, obstacle.y + obstacle.height
+        else:
+            top, bottom = obstacle.y - obstacle.height, obstacle.y
+        a[:] = (obstacle.x - sim.x)**2
+        np.copyto(a, (sim.x - max(obstacle.x, min(sim.x, obstacle.x + obstacle.width)))**2, where=unlocked)
+        np.minimum(y, bottom, out=b)
+        np.maximum(b, top, out=b)
+        np.subtract(y, b, out=b)
+        np.logical_not(unlocked, out=mask)
+        np.copyto(b, 0, where=mask)
+        np.square(b, out=b)
+        a += b
+        colliding = np.less_equal(a, PLAYER_RADIUS**2, out=mask)
+        np.subtract(y, PLAYER_RADIUS, out=b)
+        np.less_equal(b, BASE_HEIGHT, out=mask2)
+        colliding |= mask2
+        np.add(y, PLAYER_RADIUS, out=b)
+        np.greater_equal(b, HEIGHT - BASE_HEIGHT, out=mask2)
+        colliding |= mask2
+        np.logical_not(colliding, out=mask)
+        alive &= mask
+
+
+def sigmoid_(x: np.ndarray) -> np.ndarray:
+    """In-place 1 / (1 + exp(-x))."""
+    np.negative(x, out=x)
+    np.exp(x, out=x)
+    x += 1
+    return np.divide(1, x, out=x)
+
+
+def fused_step(y, vy, alive, has_key, key_collected, gate_open, passed, score, keyscore, ticks, jump_tick, jumped,
+               weights_input, weights_hidden, tick, x, obstacle_x, obstacle_y, obstacle_width, obstacle_height,
+               is_top, key_x, key_y, key_size):
+    """One tick for every player in a single loop; compiled by numba when available."""
+    past = x >= obstacle_x + obstacle_width
+    dx = obstacle_x - x
+    dx_key = x - max(key_x, min(x, key_x + key_size))
+    dx_open = x - max(obstacle_x, min(x, obstacle_x + obstacle_width))
+    if is_top:
+        top, bottom = obstacle_y - obstacle_height, obstacle_y
+    else:
+        top, bottom = obstacle_y, obstacle_y + obstacle_height
+    for i in range(len(y)):
+        if past:
+            has_key[i] = False
+        jumped[i] = False
+        if alive[i] and tick - jump_tick[i] >= JUMP_COOLDOWN_TICKS:
+            yi = y[i]
+            if is_top:
+                dy_top, dy_bottom = obstacle_y - yi, HEIGHT - BASE_HEIGHT - yi
+            else:
+                dy_top, dy_bottom = yi - BASE_HEIGHT, obstacle_y - yi
+            fx_key, fy_key = 0.0, 0.0
+            if not has_key[i]:
+                fx_key = dx_key
+                fy_key = yi - max(key_y, min(yi, key_y + key_size))
+            output = 0.0
+            for j in range(4):
+                z = (yi * weights_input[i, 0, j] + vy[i] * weights_input[i, 1, j] + dx * weights_input[i, 2, j] +
+                     dy_bottom * weights_input[i, 3, j] + dy_top * weights_input[i, 4, j] +
+                     fx_key * weights_input[i, 5, j] + fy_key * weights_input[i, 6, j])
+                output += weights_hidden[i, j, 0] / (1 + np.exp(-z))
+            if 1 / (1 + np.exp(-output)) > DECISION_THRESHOLD:
+                jumped[i] = True
+                vy[i] = JUMP_FORCE
+                jump_tick[i] = tick
+        if y[i] >= GROUND and vy[i] >= 0:
+            y[i] = GROUND
+            vy[i] = 0
+        else:
+            vy[i] += GRAVITY
+        y[i] += vy[i]
+        if not alive[i]:
+            continue
+        ticks[i] += 1
+        if past and not passed[i]:
+            score[i] += 1
+            passed[i] = True
+        yi = y[i]
+        dy_key = yi - max(key_y, min(yi, key_y + key_size))
+        if not has_key[i] and dx_key**2 + dy_key**2 <= PLAYER_RADIUS**2:
+            keyscore[i] += 1
+            has_key[i] = True
+            key_collected[i] = True
+            gate_open[i] = True
+        if gate_open[i] and has_key[i]:
+            dy = yi - max(top, min(yi, bottom))
+            distance = dx_open**2 + dy**2
+        else:
+            distance = dx**2
+        if distance <= PLAYER_RADIUS**2 or yi - PLAYER_RADIUS <= BASE_HEIGHT or yi + PLAYER_RADIUS >= HEIGHT - BASE_HEIGHT:
+            alive[i] = False
+
+
+if numba is not None:
+    fused_step_compiled = numba.njit(cache=True)(fused_step)
+
+
+class NumbaKernel():
+    """fused_step compiled by numba."""
+
+    name = 'numba'
+
+    def __init__(self, weights_input: np.ndarray, weights_hidden: np.ndarray) -> None:
+        self.weights_input = np.ascontiguousarray(weights_input, dtype=np.float64)
+        self.weights_hidden = np.ascontiguousarray(weights_hidden, dtype=np.float64)
+
+    def step(self, sim, obstacle, key) -> None:
+        fused_step_compiled(sim.y, sim.vy, sim.is_alive, sim.has_key, sim.key_collected, sim.gate_open, sim.passed,
+                            sim.score, sim.keyscore, sim.ticks, sim.jump_tick, sim.jumped,
+                            self.weights_input, self.weights_hidden, sim.tick, float(sim.x),
+                            float(obstacle.x), float(obstacle.y), float(obstacle.width), float(obstacle.height),
+                            obstacle.category == 'top', float(key.x), float(key.y), float(key.size))
+
+
+def available_kernels():
+    return ('numpy', 'numba') if numba is not None else ('numpy',)
+
+
+def make_kernel(weights_input: np.ndarray, weights_hidden: np.ndarray, name: str = KERNEL):
+    """Kernel by settings name: 'auto' (numba if importable, else numpy), 'numba' or 'numpy'."""
+    if name == 'auto':
+        name = 'numba' if numba is not None else 'numpy'
+    if name == 'numba':
+        if numba is None:
+            raise ImportError("kernel 'numba' needs the numba package")
+        return NumbaKernel(weights_input, weights_hidden)
+    elif name == 'numpy':
+        return NumpyKernel(weights_input, weights_hidden)
+    raise ValueError(f"Unknown kernel '{name}'; expected 'auto', 'numba' or 'numpy'")
+
+
+def reference_run(weights_input: np.ndarray, weights_hidden: np.ndarray, seed: int, max_ticks: int):
+    """Player objects stepped like the main game loop, with the jump cooldown counted in ticks."""
+    from src.common.player import Player
+    from src.common.world import World
+    world = World(rng=np.random.RandomState(seed))
+    players = []
+    for iw, hw in zip(weights_input, weights_hidden):
+        player = Player()
+        player.weights_input, player.weights_hidden = iw, hw
+        players.append(player)
+    passed = [False] * len(players)
+    jump_tick = [0] * len(players)
+    for tick in range(max_ticks):
+        if world.update():
+            passed = [False] * len(players)
+        obstacle, _, key = world.upcoming()
+        for i, player in enumerate(players):
+            if player.x >= obstacle.x + obstacle.width:
+                player.has_key = False
+                player.gate_open = False
+            if player.is_alive and tick - jump_tick[i] >= JUMP_COOLDOWN_TICKS:
+                player.NN_update(obstacle, key)
+                if player.NN_jump():
+                    player.vy = JUMP_FORCE
+                    jump_tick[i] = tick
+            player.update(obstacle=obstacle, key=key)
+            if player.is_alive:
+                if player.x >= obstacle.x + obstacle.width and not passed[i]:
+                    player.score += 1
+                    passed[i] = True
+                if not player.has_key and player.is_touching(key):
+                    player.collect_key()
+                if player.is_colliding(obstacle=obstacle):
+                    player.is_alive = False
+        if not any(player.is_alive for player in players):
+            break
+    return players
+
+
+def self_check(population: int = 200, seeds: int = 3, max_ticks: int = 1200, verbose: bool = True) -> bool:
+    """Compares Simulation with every available kernel against reference_run(); True if all agree."""
+    from src.common.simulation import Simulation
+    from src.common.evolution import random_weights
+    rng = np.random.RandomState(0)
+    ok = True
+    for seed in range(seeds):
+        # larger weights than random_weights() so that players jump, collect keys and pass obstacles
+        weights_input, weights_hidden = (w * rng.choice([1, 5, 25], size=(population, 1, 1))
+                                         for w in random_weights(population, rng))
+        with np.errstate(over='ignore'):
+            players = reference_run(weights_input, weights_hidden, seed, max_ticks)
+        expected = {'ticks': np.array([p.ticks for p in players]), 'score': np.array([p.score for p in players]),
+                    'keyscore': np.array([p.keyscore for p in players]), 'y': np.array([p.y for p in players])}
+        for name in available_kernels():
+            sim = Simulation(weights_input, weights_hidden, seed=seed, max_ticks=max_ticks, kernel=name)
+            sim.run()
+            mismatched = np.zeros(population, dtype=bool)
+            for field, values in expected.items():
+                mismatched |= getattr(sim, field) != values
+            ok &= not mismatched.any()
+            if verbose:
+                print(f"seed {seed}, {name}: {np.count_nonzero(mismatched)}/{population} players differ "
+                      f"(max ticks {expected['ticks'].max()}, keys {expected['keyscore'].sum()}, "
+                      f"points {expected['score'].sum()})")
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Check the Simulation kernels against Player.')
+    parser.add_argument('--population', '-p', type=int, default=200)
+    parser.add_argument('--seeds', '-m', type=int, default=3)
+    parser.add_argument('--max-ticks', type=int, default=MAX_TICKS // 3)
+    args = parser.parse_args()
+    print(f"Kernels: {', '.join(available_kernels())}")
+    sys.exit(0 if self_check(args.population, args.seeds, args.max_ticks) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -5,11 +5,12 @@ from src.common.obstacle import Obstacle
 
 
 class Key():
-    def __init__(self) -> None:
+    def __init__(self, rng=None) -> None:
+        self.rng = np.random if rng is None else rng
         self.size = KEY_SIZE
         # key spawns randomly in the inner 33% part of screen dimensions
-        self.x = np.random.randint(WIDTH // 3, 2 * WIDTH // 3)
-        self.y = np.random.randint(HEIGHT // 3, 2 * HEIGHT // 3)
+        self.x = self.rng.randint(WIDTH // 3, 2 * WIDTH // 3)
+        self.y = self.rng.randint(HEIGHT // 3, 2 * HEIGHT // 3)
         self.is_collected = False
 
     def draw(self, screen) -> None:
@@ -21,6 +22,6 @@ class Key():
 
     def update(self, obstacle: Obstacle) -> None:
         if obstacle.is_outside():
-            self.__init__()
+            self.__init__(self.rng)
         else:
             self.x -= OBSTACLE_SPEED
@@ -0,0 +1,103 @@
+import numpy as np
+from typing import List, Tuple
+from src.common.settings import LINEAGE_CAPACITY
+
+# Operators a genome can come from (Lineage.operator codes)
+INITIAL, CROSSOVER, CROSS_GENERATION, CLONE, RESET, SAMPLED = range(6)
+OPERATORS = ('initial', 'crossover', 'cross-generation', 'clone', 'reset', 'sampled')
+# Parent references in next_generation()'s origin array: population index, or one of these
+NO_PARENT = -1
+BEST_OVERALL = -2
+
+
+class Lineage():
+    """Append-only registry of every genome, with parents, operator and play statistics.
+
+    IDs are int64 and handed out in increasing order, starting at 0, so an ID is
+    also the row of the genome in the preallocated arrays: parents, operator,
+    generation and statistics are O(1) lookups. Capacity doubles when it runs
+    out. It replaces the id(player)-keyed lists of main.py, which did not follow
+    genomes across reset() and were searched with index().
+
+    Besides a genome's own score and deaths, the totals of its line (the chain
+    of first parents) are kept, so the success rate over its whole ancestry is
+    O(1) as well; over the last few generations it takes one lookup per ancestor.
+    """
+
+    def __init__(self, capacity: int = LINEAGE_CAPACITY) -> None:
+        self.size = 0
+        self.parents = np.full((capacity, 2), NO_PARENT, dtype=np.int64)
+        self.operator = np.zeros(capacity, dtype=np.int8)
+        self.generation = np.zeros(capacity, dtype=np.int32)
+        self.score = np.zeros(capacity, dtype=np.int32)  # obstacles passed
+        self.deaths = np.zeros(capacity, dtype=np.int32)
+        self.line_score = np.zeros(capacity, dtype=np.int64)  # score of the genome and all its first parents
+        self.line_deaths = np.zeros(capacity, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def reserve(self, n: int) -> None:
+        """Makes room for n more genomes."""
+        capacity = len(self.operator)
+        if self.size + n <= capacity:
+            return
+        capacity = max(2 * capacity, self.size + n)
+        for name in ('parents', 'operator', 'generation', 'score', 'deaths', 'line_score', 'line_deaths'):
+            old = getattr(self, name)
+            new = np.full((capacity, *old.shape[1:]), NO_PARENT if name == 'parents' else 0, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def register(self, n: int, operator: int | np.ndarray, parents: np.ndarray | None = None,
+                 generation: int = 0) -> np.ndarray:
+        """IDs for n new genomes with the given operator(s) and (n, 2) parent IDs (NO_PARENT if none)."""
+        self.reserve(n)
+        ids = np.arange(self.size, self.size + n, dtype=np.int64)
+        self.size += n
+        self.operator[ids] = operator
+        self.generation[ids] = generation
+        if parents is not None:
+            self.parents[ids] = parents
+            first = self.parents[ids, 0]
+            known = first >= 0
+            self.line_score[ids[known]] = self.line_score[first[known]]
+            self.line_deaths[ids[known]] = self.line_deaths[first[known]]
+        return ids
+
+    def record(self, genome_id: int | np.ndarray, score: int | np.ndarray, died: bool | np.ndarray = True) -> None:
+        """Adds the result of one run (or one per ID) to the genomes' statistics."""
+        self.score[genome_id] += score
+        self.deaths[genome_id] += died
+        self.line_score[genome_id] += score
+        self.line_deaths[genome_id] += died
+
+    def parents_of(self, genome_id: int) -> Tuple[int, int]:
+        first, second = self.parents[genome_id]
+        return int(first), int(second)
+
+    def operator_of(self, genome_id: int) -> str:
+        return OPERATORS[self.operator[genome_id]]
+
+    def ancestors(self, genome_id: int, depth: int) -> List[int]:
+        """The genome and up to depth - 1 first parents, newest first."""
+        line = []
+        while genome_id >= 0 and len(line) < depth:
+            line.append(int(genome_id))
+            genome_id = self.parents[genome_id, 0]
+        return line
+
+    def success_rate(self, genome_id: int, loss_penalty: int = 1, generations: int | None = None) -> float:
+        """Obstacle jump success rate of a genome's line: 1 / (1 + loss_penalty * deaths / score).
+
+        Over the whole line, or the genome and its first parents `generations` deep.
+        0 if the line never passed an obstacle.
+        """
+        if generations is None:
+            score, deaths = self.line_score[genome_id], self.line_deaths[genome_id]
+        else:
+            line = self.ancestors(genome_id, generations)
+            score, deaths = self.score[line].sum(), self.deaths[line].sum()
+        if score == 0:
+            return 0.0
+        return 1 / (1 + (loss_penalty * deaths) / score)
@@ -0,0 +1,32 @@
+import numpy as np
+import pygame as pg
+from src.common.settings import LOD_BINS, LOD_COLOR_LOW, LOD_COLOR_HIGH, CHAMPION_COLOR, PLAYER_START_POS, PLAYER_RADIUS, HEIGHT, BASE_HEIGHT, FONT_COLOR
+
+
+def density_bins(ys: np.ndarray, n_bins: int = LOD_BINS) -> np.ndarray:
+    """Number of live players per horizontal band between roof and ground."""
+    bins = ((np.asarray(ys) - BASE_HEIGHT) * (n_bins / (HEIGHT - 2 * BASE_HEIGHT))).astype(np.int64)
+    return np.bincount(np.clip(bins, 0, n_bins - 1), minlength=n_bins)
+
+
+def draw_density(screen, ys: np.ndarray, champion_y: float | None = None, font=None) -> None:
+    """Level-of-detail player rendering for large populations.
+
+    Instead of one circle per player, live players are drawn as a heat column
+    at PLAYER_START_POS with one rectangle per y-band, colored by log density.
+    The cost is O(LOD_BINS) draw calls whatever the population size.
+    """
+    counts = density_bins(ys)
+    if counts.max() > 0:
+        bin_height = (HEIGHT - 2 * BASE_HEIGHT) / len(counts)
+        heat = np.log1p(counts) / np.log1p(counts.max())
+        low, high = np.array(LOD_COLOR_LOW), np.array(LOD_COLOR_HIGH)
+        for n in np.flatnonzero(counts):
+            color = tuple(int(v) for v in low + heat[n] * (high - low))
+            pg.draw.rect(screen, color, (PLAYER_START_POS - PLAYER_RADIUS, BASE_HEIGHT + n * bin_height,
+                                         2 * PLAYER_RADIUS, max(1, bin_height)))
+    if champion_y is not None:
+        pg.draw.circle(screen, CHAMPION_COLOR, (PLAYER_START_POS, float(champion_y)), PLAYER_RADIUS, width=3)
+    if font is not None:
+        text = font.render(f"x{len(ys)}", True, FONT_COLOR)
+        screen.blit(text, (PLAYER_START_POS + 2 * PLAYER_RADIUS, BASE_HEIGHT + 5))
@@ -0,0 +1,86 @@
+import tracemalloc
+import warnings
+from typing import Dict
+from src.common.settings import MEMORY_MONITOR_INTERVAL, MEMORY_BUDGET_MB, MEMORY_TOP_SITES
+from src.common.metrics import MetricsExporter, process_rss
+
+MB = 2**20
+
+
+class MemoryMonitor():
+    """Opt-in memory instrumentation for long runs.
+
+    Every `interval` generations, takes a tracemalloc snapshot and an RSS sample
+    and reports the allocation sites that grew most since the previous report
+    plus the average growth per generation. Warns (RuntimeWarning) once when RSS
+    exceeds budget_mb, and again only after it has dropped back below. tracemalloc slows allocation-heavy code down, so this is
+    off unless MEMORY_MONITOR is set.
+    """
+
+    def __init__(self, interval: int = MEMORY_MONITOR_INTERVAL, budget_mb: float | None = MEMORY_BUDGET_MB,
+                 top: int = MEMORY_TOP_SITES, frames: int = 1, verbose: bool = True) -> None:
+        self.interval = interval
+        self.budget_mb = budget_mb
+        self.top = top
+        self.frames = frames
+        self.verbose = verbose
+        self.snapshot = None
+        self.last_generation = 0
+        self.traced = 0
+        self.rss = 0
+        self.warned = False  # RSS exceeded the budget at the last report
+
+    def start(self) -> None:
+        tracemalloc.start(self.frames)
+        self.snapshot = self.take_snapshot()
+        self.traced = tracemalloc.get_traced_memory()[0]
+        self.rss = process_rss()
+
+    def take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+        ))
+
+    def end_generation(self, generation: int, metrics: MetricsExporter | None = None) -> Dict | None:
+        """Reports every `interval` generations; returns the report, else None."""
+        if self.snapshot is None or generation % self.interval:
+            return None
+        snapshot = self.take_snapshot()
+        traced, peak = tracemalloc.get_traced_memory()
+        rss = process_rss()
+        n = max(generation - self.last_generation, 1)
+        report = {
+            'generation': generation,
+            'rss_bytes': rss,
+            'traced_bytes': traced,
+            'peak_traced_bytes': peak,
+            'rss_growth_per_generation': (rss - self.rss) / n,
+            'traced_growth_per_generation': (traced - self.traced) / n,
+            'top_sites': [{'site': f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                           'size': stat.size, 'size_diff': stat.size_diff, 'count': stat.count}
+                          for stat in snapshot.compare_to(self.snapshot, 'lineno')[:self.top]],
+        }
+        self.snapshot, self.traced, self.rss, self.last_generation = snapshot, traced, rss, generation
+
+        if self.verbose:
+            print(f"Memory at generation {generation}: RSS {rss / MB:.1f} MB "
+                  f"({report['rss_growth_per_generation'] / MB:+.3f} MB/gen), traced {traced / MB:.1f} MB "
+                  f"({report['traced_growth_per_generation'] / MB:+.3f} MB/gen)")
+            for site in report['top_sites']:
+                print(f"  {site['size_diff'] / MB:+.3f} MB  {site['site']} ({site['size'] / MB:.3f} MB, "
+                      f"{site['count']} blocks)")
+        if metrics is not None:
+            metrics.set('traced_memory_bytes', traced, help='Memory traced by tracemalloc')
+            metrics.set('memory_growth_bytes_per_generation', report['rss_growth_per_generation'],
+                        help='Average RSS growth per generation since the last memory report')
+        over_budget = self.budget_mb is not None and rss > self.budget_mb * MB
+        if over_budget and not self.warned:
+            warnings.warn(f"RSS {rss / MB:.1f} MB exceeds the memory budget of {self.budget_mb} MB "
+                          f"at generation {generation}", RuntimeWarning)
+        self.warned = over_budget
+        return report
+
+    def stop(self) -> None:
+        tracemalloc.stop()
+        self.snapshot = None
@@ -0,0 +1,97 @@
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+try:
+    import psutil
+except ImportError:  # optional; falls back to /proc or peak RSS
+    psutil = None
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class MetricsExporter():
+    """Serves gauges in Prometheus text format from a background thread.
+
+    The training loop only calls set(), which is a dict write under a lock, so
+    serving scrapes never slows the simulation down.
+    """
+
+    def __init__(self, port: int, host: str = '127.0.0.1', prefix: str = 'ga_') -> None:
+        self.host = host
+        self.port = port
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.values: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.help: Dict[str, str] = {}
+        self.server = None
+        self.thread = None
+
+    def set(self, name: str, value: float, help: str = '', **labels: str) -> None:
+        with self.lock:
+            self.values[(name, tuple(sorted(labels.items())))] = float(value)
+            if help:
+                self.help[name] = help
+
+    def render(self) -> str:
+        self.set('process_resident_memory_bytes', process_rss(),
+                 help='Resident set size of the training process')
+        with self.lock:
+            items = sorted(self.values.items())
+            helps = dict(self.help)
+        lines = []
+        last_name = None
+        for (name, labels), value in items:
+            if name != last_name:
+                if name in helps:
+                    lines.append(f"# HELP {self.prefix}{name} {helps[name]}")
+                lines.append(f"# TYPE {self.prefix}{name} gauge")
+                last_name = name
+            label_str = ','.join(f'{k}="{v}"' for k, v in labels)
+            label_str = '{' + label_str + '}' if label_str else ''
+            lines.append(f"{self.prefix}{name}{label_str} {value}")
+        return '\n'.join(lines) + '\n'
+
+    def start(self) -> None:
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # keep the console free for training output
+
+        self.server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+
+def process_rss() -> int:
+    """Current resident set size in bytes (peak RSS without psutil or /proc, 0 if unknown)."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        if resource is None:
+            return 0
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
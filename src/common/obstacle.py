@@ -1,14 +1,15 @@
 import numpy as np
 from src.common.settings import OBSTACLE_COLOR, OBSTACLE_SPEED, OBSTACLE_WIDTH, OBSTACLE_HEIGHT_MIN, OBSTACLE_HEIGHT_MAX, HEIGHT, WIDTH, BASE_HEIGHT
 import pygame as pg
-import random
 
 
 class Obstacle():
-    def __init__(self) -> None:
-        self.category = random.choice(['bottom', 'top'])
+    def __init__(self, rng=None) -> None:
+        # rng: a seeded np.random.RandomState makes the course reproducible
+        self.rng = np.random if rng is None else rng
+        self.category = str(self.rng.choice(['bottom', 'top']))
         self.width = OBSTACLE_WIDTH
-        self.height = np.random.randint(
+        self.height = self.rng.randint(
             OBSTACLE_HEIGHT_MIN, OBSTACLE_HEIGHT_MAX)
         self.x = WIDTH
         if self.category == 'bottom':
@@ -26,7 +27,7 @@ class Obstacle():
 
     def update(self) -> None:
         if self.is_outside():
-            self.__init__()  # bad practice, but works
+            self.__init__(self.rng)  # bad practice, but works
         self.x -= OBSTACLE_SPEED
 
     def is_outside(self) -> bool:
@@ -0,0 +1,291 @@
+import numpy as np
+from src.common.settings import CMA_SIGMA, NES_SIGMA, NES_LEARNING_RATE, MUTATION_SIZE, SELF_ADAPTIVE_MUTATION, SUCCESS_RULE
+from src.common.evolution import GENOME_SIZE, SuccessRule, flatten, unflatten, random_weights, next_generation, mutate
+from src.common.hall_of_fame import HallOfFame
+from src.common.lineage import Lineage, INITIAL, CLONE, SAMPLED, NO_PARENT
+from src.common.selection import truncation
+
+
+class Optimizer():
+    """Interface for evolvers working on flattened (GENOME_SIZE,) genomes.
+
+    ask() returns the genomes to evaluate next as an (n, genome_size) array,
+    tell() reports their fitness (higher is better). tell() gets the genomes
+    back, so callers are free to reorder the population in between.
+
+    With a lineage (lineage.Lineage), ids holds the lineage ID of each genome
+    of the last ask(), in the same order.
+
+    state_dict() returns everything needed to continue the search as a dict of
+    NumPy arrays (see checkpoint.py); load_state_dict() restores it.
+    """
+    genome_size = GENOME_SIZE
+    lineage: Lineage | None = None
+    ids: np.ndarray | None = None
+
+    def ask(self) -> np.ndarray:
+        raise NotImplementedError
+
+    def tell(self, genomes: np.ndarray, fitness: np.ndarray) -> None:
+        raise NotImplementedError
+
+    def resize(self, population_size: int) -> None:
+        """Changes the number of genomes the next ask() returns."""
+        self.population_size = population_size
+
+    def state_dict(self) -> dict:
+        raise NotImplementedError
+
+    def load_state_dict(self, state: dict) -> None:
+        raise NotImplementedError
+
+
+class GeneticOptimizer(Optimizer):
+    """The original scheme: crossover, cross-generation crossover and cloning of
+    the best overall genome plus uniform mutation (see evolution.next_generation).
+
+    The hall of fame must be updated with each generation's best before tell().
+
+    With self_adaptive, genomes carry their own mutation step size in an extra
+    column (genome_size = GENOME_SIZE + 1). With success_rule, all step sizes
+    are scaled by a population-level 1/5th success rule.
+
+    With a lineage, every child is registered with its operator and parents
+    (see next_generation's origin), so tell() needs the genomes in ask() order.
+    """
+
+    def __init__(self, population_size: int, hall_of_fame: HallOfFame, rng=np.random,
+                 self_adaptive: bool = SELF_ADAPTIVE_MUTATION, success_rule: bool = SUCCESS_RULE,
+                 initial: np.ndarray | None = None, lineage: Lineage | None = None) -> None:
+        self.hall_of_fame = hall_of_fame
+        self.lineage = lineage
+        self.rng = rng
+        self.generation = 0
+        self.self_adaptive = self_adaptive
+        self.success_rule = SuccessRule() if success_rule else None
+        self.best_fitness = -np.inf
+        self.best_step = float(MUTATION_SIZE)
+        step_sizes = None
+        if self_adaptive:
+            self.genome_size = GENOME_SIZE + 1
+            step_sizes = np.full(population_size, float(MUTATION_SIZE))
+        weights = random_weights(population_size, rng) if initial is None else unflatten(initial)
+        self.genomes = flatten(*weights, step_sizes)
+        self.population_size = len(self.genomes)
+        if lineage is not None:
+            self.ids = lineage.register(self.population_size, INITIAL, generation=1)
+
+    def ask(self) -> np.ndarray:
+        return self.genomes
+
+    def resize(self, population_size: int) -> None:
+        """Drops random genomes of the next generation, or adds mutated copies of random ones."""
+        n = len(self.genomes)
+        if population_size < n:
+            kept = np.sort(self.rng.choice(n, population_size, replace=False))
+            self.genomes = self.genomes[kept]
+            if self.ids is not None:
+                self.ids = self.ids[kept]
+        elif population_size > n:
+            copied = self.rng.randint(n, size=population_size - n)
+            extra = self.genomes[copied].copy()
+            extra[:, :GENOME_SIZE] = mutate(extra[:, :GENOME_SIZE], self.rng)
+            self.genomes = np.concatenate([self.genomes, extra])
+            if self.ids is not None:
+                parents = np.stack([self.ids[copied], np.full(len(copied), NO_PARENT)], axis=1)
+                self.ids = np.concatenate([self.ids, self.lineage.register(
+                    len(copied), CLONE, parents, generation=self.generation + 1)])
+        self.population_size = population_size
+
+    def state_dict(self) -> dict:
+        """Next population (with step sizes), generation, best fitness and step, and success rule history."""
+        rule = self.success_rule
+        return {'genomes': self.genomes, 'generation': self.generation, 'best_fitness': self.best_fitness,
+                'best_step': self.best_step, 'success_scale': 1.0 if rule is None else rule.scale,
+                'success_history': np.array([] if rule is None else list(rule.successes), dtype=bool)}
+
+    def load_state_dict(self, state: dict) -> None:
+        genomes = np.array(state['genomes'], dtype=np.float64)
+        if genomes.shape[1] != self.genome_size:
+            raise ValueError(f"Genomes of size {genomes.shape[1]} do not fit a GA with genome size "
+                             f"{self.genome_size}; check SELF_ADAPTIVE_MUTATION")
+        self.genomes = genomes
+        self.population_size = len(genomes)
+        self.generation = int(state['generation'])
+        self.best_fitness = float(state['best_fitness'])
+        self.best_step = float(state['best_step'])
+        if self.success_rule is not None:
+            self.success_rule.scale = float(state['success_scale'])
+            self.success_rule.successes.clear()
+            self.success_rule.successes.extend(bool(success) for success in state['success_history'])
+        if self.lineage is not None:
+            self.ids = self.lineage.register(self.population_size, INITIAL, generation=self.generation + 1)
+
+    def tell(self, genomes: np.ndarray, fitness: np.ndarray) -> None:
+        self.generation += 1
+        weights_input, weights_hidden = unflatten(genomes)
+        step_sizes = genomes[:, GENOME_SIZE] if self.self_adaptive else None
+        best = truncation(fitness, 1)[0]
+        success = fitness[best] > self.best_fitness
+        if success:
+            self.best_fitness = fitness[best]
+            if step_sizes is not None:
+                self.best_step = step_sizes[best]
+        scale = self.success_rule.update(success) if self.success_rule is not None else 1.0
+        best_iw, best_hw = self.hall_of_fame.best()
+        origin = None if self.lineage is None else np.empty((len(genomes), 3), dtype=np.int64)
+        self.genomes = flatten(*next_generation(weights_input, weights_hidden, fitness, best_iw, best_hw,
+                                                reset_population=self.hall_of_fame.should_reset(self.generation),
+                                                rng=self.rng, step_sizes=step_sizes,
+                                                best_overall_step=self.best_step, scale=scale, origin=origin))
+        if origin is not None:
+            # parent indices -> IDs; BEST_OVERALL (-2) and NO_PARENT (-1) index the two appended entries
+            ids = np.concatenate([self.ids, [self.hall_of_fame.best_id, NO_PARENT]])
+            self.ids = self.lineage.register(len(origin), origin[:, 0], ids[origin[:, 1:]],
+                                             generation=self.generation + 1)
+
+
+class CMAES(Optimizer):
+    """(mu/mu_w, lambda)-CMA-ES with rank-one and rank-mu covariance updates.
+
+    All updates are matrix operations on the whole population; the 32 x 32
+    covariance is re-decomposed every generation, which is negligible next to
+    evaluation.
+    """
+
+    def __init__(self, population_size: int, sigma: float = CMA_SIGMA, mean: np.ndarray | None = None,
+                 rng=np.random, lineage: Lineage | None = None) -> None:
+        n = GENOME_SIZE
+        self.rng = rng
+        self.lineage = lineage
+        self.resize(population_size)
+        self.chi_n = np.sqrt(n) * (1 - 1 / (4 * n) + 1 / (21 * n**2))
+        self.mean = np.zeros(n) if mean is None else np.array(mean, dtype=np.float64)
+        self.sigma = sigma
+        self.C = np.eye(n)
+        self.B = np.eye(n)
+        self.D = np.ones(n)
+        self.pc = np.zeros(n)
+        self.ps = np.zeros(n)
+        self.generation = 0
+
+    def resize(self, population_size: int) -> None:
+        """Sets lambda and the strategy parameters that depend on it; mean, paths and covariance are kept."""
+        n = GENOME_SIZE
+        self.population_size = population_size
+        self.mu = population_size // 2
+        weights = np.log(self.mu + 0.5) - np.log(np.arange(1, self.mu + 1))
+        self.weights = weights / weights.sum()
+        self.mueff = 1 / np.sum(self.weights**2)
+        self.cc = (4 + self.mueff / n) / (n + 4 + 2 * self.mueff / n)
+        self.cs = (self.mueff + 2) / (n + self.mueff + 5)
+        self.c1 = 2 / ((n + 1.3)**2 + self.mueff)
+        self.cmu = min(1 - self.c1, 2 * (self.mueff - 2 + 1 / self.mueff) / ((n + 2)**2 + self.mueff))
+        self.damps = 1 + 2 * max(0, np.sqrt((self.mueff - 1) / (n + 1)) - 1) + self.cs
+
+    def state_dict(self) -> dict:
+        return {'population_size': self.population_size, 'mean': self.mean, 'sigma': self.sigma, 'C': self.C,
+                'B': self.B, 'D': self.D, 'pc': self.pc, 'ps': self.ps, 'generation': self.generation}
+
+    def load_state_dict(self, state: dict) -> None:
+        self.resize(int(state['population_size']))
+        for name in ('mean', 'C', 'B', 'D', 'pc', 'ps'):
+            setattr(self, name, np.array(state[name], dtype=np.float64))
+        self.sigma = float(state['sigma'])
+        self.generation = int(state['generation'])
+
+    def ask(self) -> np.ndarray:
+        z = self.rng.standard_normal((self.population_size, GENOME_SIZE))
+        if self.lineage is not None:
+            self.ids = self.lineage.register(self.population_size, SAMPLED, generation=self.generation + 1)
+        return self.mean + self.sigma * (z * self.D) @ self.B.T
+
+    def tell(self, genomes: np.ndarray, fitness: np.ndarray) -> None:
+        n = GENOME_SIZE
+        self.generation += 1
+        elite = truncation(fitness, self.mu)
+        y = (genomes[elite] - self.mean) / self.sigma
+        y_w = self.weights @ y
+        self.mean = self.mean + self.sigma * y_w
+
+        # - Evolution paths -
+        c_inv_sqrt = self.B @ np.diag(1 / self.D) @ self.B.T
+        self.ps = (1 - self.cs) * self.ps + np.sqrt(self.cs * (2 - self.cs) * self.mueff) * c_inv_sqrt @ y_w
+        ps_norm = np.linalg.norm(self.ps)
+        hsig = ps_norm / np.sqrt(1 - (1 - self.cs)**(2 * self.generation)) / self.chi_n < 1.4 + 2 / (n + 1)
+        self.pc = (1 - self.cc) * self.pc + hsig * np.sqrt(self.cc * (2 - self.cc) * self.mueff) * y_w
+
+        # - Covariance and step size -
+        rank_mu = (y.T * self.weights) @ y
+        self.C = (1 - self.c1 - self.cmu) * self.C \
+            + self.c1 * (np.outer(self.pc, self.pc) + (1 - hsig) * self.cc * (2 - self.cc) * self.C) \
+            + self.cmu * rank_mu
+        self.sigma *= np.exp((self.cs / self.damps) * (ps_norm / self.chi_n - 1))
+        self.C = (self.C + self.C.T) / 2
+        eigenvalues, self.B = np.linalg.eigh(self.C)
+        self.D = np.sqrt(np.maximum(eigenvalues, 1e-20))
+
+
+class NaturalES(Optimizer):
+    """OpenAI-style natural evolution strategy with antithetic sampling.
+
+    Genomes come in mirrored pairs mean +- sigma * eps, and the search
+    gradient is estimated from centered fitness ranks, which makes it
+    insensitive to the scale of the fitness function.
+    """
+
+    def __init__(self, population_size: int, sigma: float = NES_SIGMA, learning_rate: float = NES_LEARNING_RATE,
+                 mean: np.ndarray | None = None, rng=np.random, lineage: Lineage | None = None) -> None:
+        self.rng = rng
+        self.lineage = lineage
+        self.generation = 0
+        self.population_size = population_size
+        self.sigma = sigma
+        self.learning_rate = learning_rate
+        self.mean = np.zeros(GENOME_SIZE) if mean is None else np.array(mean, dtype=np.float64)
+
+    def ask(self) -> np.ndarray:
+        eps = self.rng.standard_normal((self.population_size // 2, GENOME_SIZE))
+        genomes = [self.mean + self.sigma * eps, self.mean - self.sigma * eps]
+        if self.population_size % 2:
+            genomes.append(self.mean[None])
+        if self.lineage is not None:
+            self.ids = self.lineage.register(self.population_size, SAMPLED, generation=self.generation + 1)
+        return np.concatenate(genomes)
+
+    def state_dict(self) -> dict:
+        return {'population_size': self.population_size, 'mean': self.mean, 'sigma': self.sigma,
+                'generation': self.generation}
+
+    def load_state_dict(self, state: dict) -> None:
+        self.population_size = int(state['population_size'])
+        self.mean = np.array(state['mean'], dtype=np.float64)
+        self.sigma = float(state['sigma'])
+        self.generation = int(state['generation'])
+
+    def tell(self, genomes: np.ndarray, fitness: np.ndarray) -> None:
+        self.generation += 1
+        eps = (genomes - self.mean) / self.sigma
+        ranks = np.empty(len(fitness))
+        ranks[np.argsort(fitness, kind='stable')] = np.arange(len(fitness))
+        ranks = ranks / max(len(fitness) - 1, 1) - 0.5
+        gradient = ranks @ eps / (len(fitness) * self.sigma)
+        self.mean = self.mean + self.learning_rate * gradient
+
+
+def make_optimizer(name: str, population_size: int, hall_of_fame: HallOfFame, rng=np.random,
+                   initial: np.ndarray | None = None, lineage: Lineage | None = None) -> Optimizer:
+    """Optimizer by settings name: 'ga', 'cmaes' or 'nes'.
+
+    initial, e.g. from demonstrations.warm_start_genomes(), replaces the random first
+    population of the GA; the evolution strategies start from its first (best) genome.
+    lineage, if given, registers every genome (see Optimizer.ids).
+    """
+    mean = None if initial is None else initial[0]
+    if name == 'ga':
+        return GeneticOptimizer(population_size, hall_of_fame, rng=rng, initial=initial, lineage=lineage)
+    elif name == 'cmaes':
+        return CMAES(population_size, mean=mean, rng=rng, lineage=lineage)
+    elif name == 'nes':
+        return NaturalES(population_size, mean=mean, rng=rng, lineage=lineage)
+    raise ValueError(f"Unknown optimizer '{name}'; expected 'ga', 'cmaes' or 'nes'")
@@ -1,10 +1,9 @@
 import numpy as np
-import random
+from typing import List
 import time
 import pygame as pg
-from src.common.settings import PLAYER_RADIUS, PLAYER_COLOR, PLAYER_DEATH_COLOR, PLAYER_START_HEIGHT, PLAYER_START_POS, JUMP_FORCE, HEIGHT, BASE_HEIGHT, GRAVITY, MUTATION_SIZE, OBSTACLE_SPEED, MUTATION_CHANCE, PLAYER_JUMP_COOLDOWN, GAME_FPS, DECISION_THRESHOLD, FITNESS_WEIGHT_ALIVE, FITNESS_WEIGHT_KEYSCORE, WIDTH
+from src.common.settings import PLAYER_RADIUS, PLAYER_COLOR, PLAYER_DEATH_COLOR, PLAYER_START_HEIGHT, PLAYER_START_POS, JUMP_FORCE, HEIGHT, BASE_HEIGHT, GRAVITY, MUTATION_SIZE, OBSTACLE_SPEED, PLAYER_JUMP_COOLDOWN, GAME_FPS, DECISION_THRESHOLD, FITNESS_WEIGHT_ALIVE, FITNESS_WEIGHT_KEYSCORE, WIDTH
 from src.common.obstacle import Obstacle
-from src.common.gate import Gate
 from src.common.key import Key
 
 
@@ -23,6 +22,9 @@ class Player():
         self.score = 0
         self.keyscore = 0
         self.has_key = False
+        self.gate_open = False  # the upcoming gate is open for this player only
+        self.ticks = 0  # game ticks survived; used for replays
+        self.jump_ticks: List[int] = []  # ticks at which a jump was executed
         self.is_AI = is_AI  # NOTE: bit silly to define as new attribute
         # AI-only attributes:
         if self.is_AI:
@@ -33,6 +35,8 @@ class Player():
             self.dx_key = 0
             self.weights_input = np.random.normal(0, scale=0.1, size=(7, 4))
             self.weights_hidden = np.random.normal(0, scale=0.1, size=(4, 1))
+            self.step_size = MUTATION_SIZE  # the optimizer's step size for the weights, assigned by main.py with them
+            self.genome_id = -1  # lineage.Lineage ID of the weights, assigned with them
 
     def draw(self, screen) -> None:
         if self.is_alive:
@@ -44,6 +48,7 @@ class Player():
     def update(self, obstacle: Obstacle, key: Key, fps: int = GAME_FPS) -> None:
         if self.x >= obstacle.x + obstacle.width:
             self.has_key = False
+            self.gate_open = False
         if self.is_alive:
             # If AI toggled, handle AI jumping
             if self.is_AI:
@@ -58,15 +63,18 @@ class Player():
             self.vy += GRAVITY
         # Update kinematics
         self.y += self.vy
+        if self.is_alive:
+            self.ticks += 1
 
     def jump(self, fps: int = GAME_FPS) -> None:
         if time.time() - self.jump_time >= self.jump_cd * 60 / fps:
             self.vy = JUMP_FORCE
             self.jump_time = time.time()
+            self.jump_ticks.append(self.ticks)
 
-    def is_colliding(self, obstacle: Obstacle, gate: Gate) -> bool:
-        # 1: Check if gate is open
-        if not gate.is_open:
+    def is_colliding(self, obstacle: Obstacle) -> bool:
+        # 1: Check if gate is open (for this player)
+        if not self.gate_open:
             dx = obstacle.x - self.x
             dy = 0
         # 2: If open, check if player has keey
@@ -87,6 +95,12 @@ class Player():
 
         return (dx**2 + dy**2 <= self.radius**2) or (self.y - self.radius <= BASE_HEIGHT) or (self.y + self.radius >= HEIGHT - BASE_HEIGHT)
 
+    def collect_key(self) -> None:
+        """Key touch event: opens the upcoming gate for this player only."""
+        self.keyscore += 1
+        self.has_key = True
+        self.gate_open = True
+
     def is_touching(self, key: Key) -> bool:
         dx = self.x - max(key.x, min(self.x, key.x + key.size))
         dy = self.y - max(key.y, min(self.y, key.y + key.size))
@@ -120,14 +134,18 @@ class Player():
             self.dy_top = obstacle.y - self.y
             self.dy_bottom = HEIGHT - BASE_HEIGHT - self.y
 
+    def features(self) -> List[float]:
+        # NN inputs as computed by NN_update; also recorded from human play
+        return [self.y,
+                self.vy,
+                self.dx,
+                self.dy_bottom,
+                self.dy_top,
+                self.dx_key,
+                self.dy_key]
+
     def NN_jump(self):
-        genes = [self.y,
-                 self.vy,
-                 self.dx,
-                 self.dy_bottom,
-                 self.dy_top,
-                 self.dx_key,
-                 self.dy_key]
+        genes = self.features()
         hidden_layer_in = np.dot(genes, self.weights_input)
         hidden_layer_out = self.sigmoid(hidden_layer_in)
         output_layer_in = np.dot(hidden_layer_out, self.weights_hidden)
@@ -145,24 +163,6 @@ class Player():
         self.is_animating = True
         self.time_alive = round(time.time() - self.init_time, 3)
 
-    def mutate(self):
-        for nw in range(len(self.weights_input)):
-            for w in range(len(self.weights_input[nw])):
-                if random.random() <= MUTATION_CHANCE:
-                    self.weights_input[nw][w] += self.mutation_rate()
-
-        for nw in range(len(self.weights_hidden)):
-            for w in range(len(self.weights_hidden[nw])):
-                if random.random() <= MUTATION_CHANCE:
-                    self.weights_hidden[nw][w] += self.mutation_rate()
-
-    def mutation_rate(self):
-        # "dynamic" random "learning rate" to simulate mutation
-        # NOTE: Consider if adding regularization possible
-        # NOTE: Consider if adaptive step-size / learning rate is possible
-        learning_rate = MUTATION_SIZE * np.random.uniform(-0.25, 0.25)
-        return learning_rate
-
     def fitness(self):
         # Returns the normalized weighted sum of performance metrics
         # These include:
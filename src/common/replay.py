@@ -0,0 +1,102 @@
+import numpy as np
+from pathlib import Path
+from typing import Dict, List
+from src.common.settings import JUMP_FORCE
+from src.common.player import Player
+from src.common.world import World
+
+
+class ReplayRecorder():
+    """Collects the course seed and jump decisions of each generation's best player.
+
+    Jumps are stored as one bit per tick survived, so a run of a few thousand
+    ticks only takes a few hundred bytes.
+    """
+
+    def __init__(self) -> None:
+        self.generations: List[int] = []
+        self.seeds: List[int] = []
+        self.death_ticks: List[int] = []
+        self.fitness: List[float] = []
+        self.packed_jumps: List[np.ndarray] = []
+
+    def record(self, generation: int, seed: int, jump_ticks: List[int], death_tick: int, fitness: float) -> None:
+        jumps = np.zeros(death_tick, dtype=bool)
+        jumps[[t for t in jump_ticks if t < death_tick]] = True
+        self.generations.append(generation)
+        self.seeds.append(seed)
+        self.death_ticks.append(death_tick)
+        self.fitness.append(fitness)
+        self.packed_jumps.append(np.packbits(jumps))
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        lengths = [len(p) for p in self.packed_jumps]
+        np.savez_compressed(path,
+                            generation=np.array(self.generations, dtype=np.int32),
+                            seed=np.array(self.seeds, dtype=np.int64),
+                            death_tick=np.array(self.death_ticks, dtype=np.int32),
+                            fitness=np.array(self.fitness, dtype=np.float32),
+                            offsets=np.cumsum([0] + lengths, dtype=np.int64),
+                            jumps=np.concatenate(self.packed_jumps) if self.packed_jumps else np.zeros(0, dtype=np.uint8))
+
+
+def load_replay(path: str) -> Dict[str, np.ndarray]:
+    with np.load(path) as data:
+        return {k: data[k] for k in data.files}
+
+
+def unpack_jumps(replay: Dict[str, np.ndarray], index: int) -> np.ndarray:
+    """Returns the per-tick jump decisions of the run stored at `index`."""
+    start, stop = replay['offsets'][index], replay['offsets'][index + 1]
+    bits = np.unpackbits(replay['jumps'][start:stop])
+    return bits[:replay['death_tick'][index]].astype(bool)
+
+
+class ReplayRun():
+    """Deterministic reconstruction of a recorded run.
+
+    The course is regenerated from its seed and the recorded jumps are applied
+    tick by tick, in the same update order as the main game loop. No policy is
+    evaluated, so any tick can be reached by simply stepping forward.
+    """
+
+    def __init__(self, seed: int, jumps: np.ndarray) -> None:
+        self.seed = seed
+        self.jumps = jumps
+        self.death_tick = len(jumps)
+        self.tick = 0
+        self.world = World(rng=np.random.RandomState(seed))
+        self.player = Player()
+        self.passed_obstacle = False
+
+    def step(self) -> bool:
+        """Advances one tick. Returns False once the player has died."""
+        if not self.player.is_alive:
+            return False
+        if self.world.update():
+            self.passed_obstacle = False
+        obstacle, gate, key = self.world.upcoming()
+        if self.tick < self.death_tick and self.jumps[self.tick]:
+            self.player.vy = JUMP_FORCE
+        self.player.update(obstacle=obstacle, key=key)
+        if self.player.x >= obstacle.x + obstacle.width and not self.passed_obstacle:
+            self.player.score += 1
+            self.passed_obstacle = True
+        if not self.player.has_key and self.player.is_touching(key):
+            self.player.collect_key()
+            key.is_collected = True  # drawing only
+            gate.is_open = True
+        if self.player.is_colliding(obstacle=obstacle):
+            self.player.kill()
+        self.tick += 1
+        return self.player.is_alive
+
+    def seek(self, tick: int) -> None:
+        """Fast-forwards (without rendering) to the given tick, or the death tick if earlier."""
+        while self.tick < tick and self.step():
+            pass
+
+    def draw(self, screen) -> None:
+        self.player.draw(screen)
+        self.world.draw(screen)
@@ -0,0 +1,90 @@
+import re
+import time
+import numpy as np
+from typing import NamedTuple
+from src.common.settings import MAX_TICKS, POPULATION_SIZE, BUDGET_GENERATION_SECONDS, BUDGET_POPULATION_BOUNDS, BUDGET_MAX_EPISODES, BUDGET_TICK_BOUNDS, BUDGET_TICK_HEADROOM
+
+
+class Plan(NamedTuple):
+    population_size: int
+    episodes: int  # courses every genome is evaluated on; fitness is the mean
+    max_ticks: int
+
+
+def parse_duration(text: str) -> float:
+    """Seconds in '90', '90s', '45m', '2h' or '1h30m'."""
+    parts = re.fullmatch(r'\s*(?:(\d+(?:\.\d+)?)h)?\s*(?:(\d+(?:\.\d+)?)m)?\s*(?:(\d+(?:\.\d+)?)s?)?\s*', text)
+    if parts is None or not any(parts.groups()):
+        raise ValueError(f"Invalid duration '{text}'; expected e.g. 90, 45m, 2h or 1h30m")
+    hours, minutes, seconds = (float(part or 0) for part in parts.groups())
+    return 3600 * hours + 60 * minutes + seconds
+
+
+class BudgetScheduler():
+    """Fits training into a wall-clock budget instead of a fixed number of generations.
+
+    After each generation, record() takes the simulated player-ticks and the
+    wall-clock time of the whole generation (evaluation on however many workers,
+    plus evolution), so throughput is measured live in player-ticks per second.
+    next_plan() then sizes the next generation to take at most generation_seconds:
+    - the tick cap is `headroom` times the longest survival so far, so it only
+      binds for genomes that clearly beat everything seen before;
+    - the affordable player-ticks, divided by the cap, give the genome
+      evaluations per generation, so a generation fits even if every genome
+      survives to the cap;
+    - these go to a larger population first and, once it reaches its upper
+      bound, to more episodes per genome.
+    Towards the end, a generation gets at most the remaining time: population and
+    episodes shrink first, down to the smallest population and one episode, and
+    only then the cap, never below its lower bound. next_plan() returns None
+    once not even that fits, and training stops.
+    """
+
+    def __init__(self, budget_seconds: float, population_size: int = POPULATION_SIZE,
+                 generation_seconds: float = BUDGET_GENERATION_SECONDS,
+                 population_bounds: tuple = BUDGET_POPULATION_BOUNDS, max_episodes: int = BUDGET_MAX_EPISODES,
+                 tick_bounds: tuple = BUDGET_TICK_BOUNDS, headroom: float = BUDGET_TICK_HEADROOM,
+                 smoothing: float = 0.5, clock=time.perf_counter) -> None:
+        self.clock = clock
+        self.deadline = clock() + budget_seconds
+        self.generation_seconds = generation_seconds
+        self.population_bounds = population_bounds
+        self.max_episodes = max_episodes
+        self.tick_bounds = tick_bounds
+        self.headroom = headroom
+        self.smoothing = smoothing  # weight of the newest measurement in the throughput average
+        self.throughput = None  # player-ticks per second
+        self.longest = 0  # most ticks survived in one episode so far
+        self.plan = Plan(int(np.clip(population_size, *population_bounds)), 1, int(np.clip(MAX_TICKS, *tick_bounds)))
+
+    def remaining(self) -> float:
+        return max(self.deadline - self.clock(), 0.0)
+
+    def next_plan(self) -> Plan | None:
+        """Plan of the next generation, or None if the budget cannot fit one."""
+        remaining = self.remaining()
+        if self.throughput is None:
+            return self.plan if remaining > 0 else None
+        max_ticks = int(np.clip(self.headroom * self.longest, *self.tick_bounds))
+        player_ticks = min(self.generation_seconds, remaining) * self.throughput
+        evaluations = player_ticks / max_ticks
+        if evaluations < self.population_bounds[0]:
+            # smallest population, one episode; the cap gives way last
+            max_ticks = int(player_ticks / self.population_bounds[0])
+            if max_ticks < self.tick_bounds[0]:
+                return None
+            evaluations = self.population_bounds[0]
+        population_size = int(min(evaluations, self.population_bounds[1]))
+        episodes = int(np.clip(evaluations // population_size, 1, self.max_episodes))
+        self.plan = Plan(population_size, episodes, max_ticks)
+        return self.plan
+
+    def record(self, ticks: np.ndarray, seconds: float) -> None:
+        """Reports a finished generation: (population, episodes) ticks survived, and its wall-clock time."""
+        ticks = np.asarray(ticks).reshape(len(ticks), -1)
+        throughput = ticks.sum() / max(seconds, 1e-9)
+        if self.throughput is None:
+            self.throughput = throughput
+        else:
+            self.throughput += self.smoothing * (throughput - self.throughput)
+        self.longest = max(self.longest, int(ticks.max()))
@@ -0,0 +1,82 @@
+import numpy as np
+from typing import Tuple
+from src.common.settings import SELECTION, KEEP_PARENTS, TOURNAMENT_SIZE
+
+# All functions work on a precomputed (P,) fitness array, higher is better, and return
+# population indices, so no Player objects or fitness() calls are involved.
+
+
+def truncation(fitness: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k fittest, best first, in O(P + k log k) via argpartition.
+
+    Ties are ordered like the last entries of a stable ascending sort (later index first),
+    as main.py's sorted(population)[-1]; ties at the cut itself are broken arbitrarily.
+    """
+    fitness = np.asarray(fitness)
+    k = min(k, len(fitness))
+    if k == 1:  # plain argmax, preferring the last maximum
+        return np.array([len(fitness) - 1 - np.argmax(fitness[::-1])])
+    elite = np.argpartition(-fitness, k - 1)[:k] if k < len(fitness) else np.arange(len(fitness))
+    return elite[np.lexsort((-elite, -fitness[elite]))]
+
+
+def truncation_pairs(fitness: np.ndarray, shape: Tuple[int, ...], k: int = KEEP_PARENTS, rng=np.random) -> np.ndarray:
+    """Uniform picks among the k fittest; the last axis of shape holds distinct parents (if k allows)."""
+    elite = truncation(fitness, k)
+    k = len(elite)
+    picks = rng.randint(k, size=shape)
+    if shape and shape[-1] == 2 and k > 1:  # second parent differs from the first
+        picks[..., 1] = (picks[..., 0] + 1 + rng.randint(k - 1, size=shape[:-1])) % k
+    return elite[picks]
+
+
+def tournament(fitness: np.ndarray, shape: Tuple[int, ...], size: int = TOURNAMENT_SIZE, rng=np.random) -> np.ndarray:
+    """Winners of tournaments between `size` uniformly drawn individuals."""
+    fitness = np.asarray(fitness)
+    candidates = rng.randint(len(fitness), size=(*shape, size))
+    winners = np.argmax(fitness[candidates], axis=-1)
+    return np.take_along_axis(candidates, winners[..., None], axis=-1)[..., 0]
+
+
+def roulette(weights: np.ndarray, shape: Tuple[int, ...], rng=np.random) -> np.ndarray:
+    """Indices drawn with probability proportional to non-negative weights.
+
+    Stochastic universal sampling: evenly spaced pointers with one random offset,
+    located in the cumulative weights by a single binary search over sorted queries,
+    then shuffled. Lower variance than independent spins, and O(P + m log P).
+    """
+    m = int(np.prod(shape))
+    cumulative = np.cumsum(weights, dtype=np.float64)
+    pointers = (rng.random_sample() + np.arange(m)) * (cumulative[-1] / m)
+    picks = np.minimum(np.searchsorted(cumulative, pointers, side='right'), len(cumulative) - 1)
+    return rng.permutation(picks).reshape(shape)
+
+
+def rank(fitness: np.ndarray, shape: Tuple[int, ...], rng=np.random) -> np.ndarray:
+    """Linear ranking: probability proportional to rank (1 for the worst, P for the best)."""
+    fitness = np.asarray(fitness)
+    ranks = np.empty(len(fitness))
+    ranks[np.argsort(fitness, kind='stable')] = np.arange(1, len(fitness) + 1)
+    return roulette(ranks, shape, rng)
+
+
+def proportional(fitness: np.ndarray, shape: Tuple[int, ...], rng=np.random) -> np.ndarray:
+    """Roulette wheel: probability proportional to fitness (shifted to be non-negative)."""
+    weights = np.asarray(fitness, dtype=np.float64) - min(np.min(fitness), 0)
+    if weights.sum() <= 0:
+        return rng.randint(len(weights), size=shape)
+    return roulette(weights, shape, rng)
+
+
+def select_parents(fitness: np.ndarray, shape: Tuple[int, ...], method: str = SELECTION, rng=np.random) -> np.ndarray:
+    """Parent indices of the given shape, e.g. (n, 2) for n crossovers, by settings name:
+    'truncation' (among the KEEP_PARENTS fittest), 'tournament', 'rank' or 'proportional'."""
+    if method == 'truncation':
+        return truncation_pairs(fitness, shape, rng=rng)
+    elif method == 'tournament':
+        return tournament(fitness, shape, rng=rng)
+    elif method == 'rank':
+        return rank(fitness, shape, rng=rng)
+    elif method == 'proportional':
+        return proportional(fitness, shape, rng=rng)
+    raise ValueError(f"Unknown selection '{method}'; expected 'truncation', 'tournament', 'rank' or 'proportional'")
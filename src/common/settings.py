@@ -11,6 +11,9 @@ OBSTACLE_COLOR = (0, 0, 0)
 GATE_CLOSED_COLOR = (60, 60, 60)
 KEY_COLOR = (0, 255, 0)
 KEY_SIZE = 80
+# horizontal distance between consecutive obstacles; WIDTH + OBSTACLE_WIDTH gives one obstacle
+# on screen at a time, lower values give denser courses
+OBSTACLE_SPACING = WIDTH + OBSTACLE_WIDTH
 
 OBSTACLE_SPEED = 5
 GRAVITY = 0.5
@@ -24,6 +27,12 @@ PLAYER_RADIUS = 20
 # PLAYER_JUMP_COOLDOWN tied to GAME_FPS; actual cd is = PLAYER_JUMP_COOLDOWN when GAME_FPS = 60
 PLAYER_COLOR = (128, 128, 128)
 PLAYER_DEATH_COLOR = (255, 0, 0)
+# Level-of-detail rendering: above LOD_THRESHOLD players, draw a density column instead of circles
+LOD_THRESHOLD = 200
+LOD_BINS = 60
+LOD_COLOR_LOW = (220, 220, 120)
+LOD_COLOR_HIGH = (200, 30, 30)
+CHAMPION_COLOR = (0, 0, 255)
 
 FONT_COLOR = (128, 128, 128)
 FONT_INFO_COLOR = (255, 0, 0)
@@ -34,14 +43,31 @@ FONT_TYPE = 'Calibri'
 is_AI = True
 MAX_GENERATIONS = 100
 POPULATION_SIZE = 50
+MAX_TICKS = 60 * GAME_FPS  # tick cap per generation in headless training (60 s of game time)
+KERNEL = 'auto'  # Simulation tick kernel: 'auto' (numba if installed, else 'numpy'), 'numba' or 'numpy'
+COMPACT_GENOME_DTYPE = 'int8'  # massive-population mode (train.py --compact): 'int8' (+ scale) or 'float16'
+COMPACT_BATCH_SIZE = 65536  # individuals dequantized and stepped at once in compact mode
 # - Mutation & Crossover -
 MUTATION_CHANCE = 0.2  # mutation probability per weight
 MUTATION_SIZE = 0.5  # value of 1 gives up to +-0.25 to weights
 KEEP_PARENTS = 2
+SELECTION = 'truncation'  # crossover parents: 'truncation' (among KEEP_PARENTS), 'tournament', 'rank' or 'proportional'
+TOURNAMENT_SIZE = 3
 CROSSOVER_RATE = 0.0
 CROSS_GENERATION_RATE = 0.0
 # NOTE: The remainder 1 - CROSSOVER_RATE - CROSS_GENERATION_RATE is for cloning and culling
 RESET_THRESHOLD = 10  # partially reset population genes after some generations
+SELF_ADAPTIVE_MUTATION = False  # each genome evolves its own step size, starting at MUTATION_SIZE
+STEP_SIZE_TAU = 0.18  # log-normal step size learning rate, about 1/sqrt(number of weights)
+STEP_SIZE_BOUNDS = (0.01, 2.0)
+SUCCESS_RULE = False  # scale all step sizes by the 1/5th success rule
+SUCCESS_RULE_WINDOW = 10  # generations between step size adjustments
+SUCCESS_RULE_FACTOR = 0.85
+# - Optimizer -
+OPTIMIZER = 'ga'  # 'ga' (crossover/cloning above), 'cmaes' or 'nes'
+CMA_SIGMA = 0.1  # initial CMA-ES step size
+NES_SIGMA = 0.1  # NES perturbation size
+NES_LEARNING_RATE = 0.05
 # - Other -
 DECISION_THRESHOLD = 0.5
 # NOTE: threshold in range [0,1] to pass prediction for player to jump. determined empirically to achieve a
@@ -51,3 +77,47 @@ LOSS_PENALTY = 1  # death/loss scaling relative to score points
 EM_KSUCCESS = 5  # last k generations for jump success rate evaluation
 FITNESS_WEIGHT_ALIVE = 1  # fitness weight for time alive
 FITNESS_WEIGHT_KEYSCORE = 1  # fitness weight for collecting key
+# - Replay -
+RECORD_REPLAY = True  # store seed + jump ticks of each generation's best player
+REPLAY_FILE = 'GA_data/replay.npz'
+RECORD_HUMAN_PLAY = True  # human mode: log the NN inputs and SPACE presses of every tick
+HUMAN_PLAY_FILE = 'GA_data/human_play.npz'
+WARM_START = False  # fit the first AI population to HUMAN_PLAY_FILE instead of random weights
+CHAMPION_FILE = 'GA_data/champion.npz'  # best genome so far, exported by main.py and src.train
+PLAY_WITH_CHAMPION = True  # human mode: the exported champion plays alongside the user, if it exists
+# - Monitoring -
+METRICS_PORT = None  # e.g. 9108 to serve Prometheus metrics on http://127.0.0.1:<port>/metrics
+MEMORY_MONITOR = False  # tracemalloc + RSS reports during training (slows allocation down)
+MEMORY_MONITOR_INTERVAL = 10  # generations between memory reports
+MEMORY_BUDGET_MB = None  # e.g. 2048 to warn once RSS exceeds it
+MEMORY_TOP_SITES = 5  # allocation sites listed per report
+# - Headless training / viewer -
+SHM_NAME = 'ga_project_state'  # shared-memory block the trainer publishes snapshots to
+SHM_SLOTS = 4  # ring buffer length
+VIEWER_FPS = 60
+BACKGROUND_TRAINING = False  # human mode: run src.train in a background process while the user plays
+BACKGROUND_GENERATIONS = 100_000
+BACKGROUND_SHM_NAME = 'ga_project_background'  # snapshots of the background trainer, read by the HUD
+BACKGROUND_PUBLISH_INTERVAL = 60  # ticks between background trainer snapshots
+# - Time budget (src.train --budget) -
+BUDGET_GENERATION_SECONDS = 10  # target wall-clock length of one generation
+BUDGET_POPULATION_BOUNDS = (20, 2000)
+BUDGET_MAX_EPISODES = 5  # courses per genome once the population is at its upper bound
+BUDGET_TICK_BOUNDS = (10 * GAME_FPS, 600 * GAME_FPS)  # range of the per-generation tick cap
+BUDGET_TICK_HEADROOM = 2  # tick cap relative to the longest survival so far
+CHECKPOINT_FILE = 'GA_data/checkpoint.npz'  # population and hall of fame, written when training stops
+# - Snapshot forking (src.train --fork) -
+FORK = False  # evaluate part of each generation from a snapshot shortly before the last champion died
+FORK_LEAD_TICKS = 2 * GAME_FPS  # snapshot this many ticks before the champion's death
+FORK_FRACTION = 0.5  # share of the population evaluated from the snapshot; the rest runs full courses
+# - Hall of fame -
+HALL_OF_FAME_SIZE = 16  # best distinct genomes kept across generations
+HALL_OF_FAME_DTYPE = 'float32'  # or 'float16' for a smaller archive
+LINEAGE_CAPACITY = POPULATION_SIZE * MAX_GENERATIONS  # genomes preallocated in lineage.Lineage
+# - Distributed evaluation -
+BROKER_HOST = '127.0.0.1'  # interface the broker listens on; '0.0.0.0' for remote workers (unauthenticated)
+BROKER_PORT = 5555
+BROKER_BATCH_SIZE = 64  # genomes per work unit
+BROKER_TIMEOUT = 120  # seconds before a silent worker is dropped and its unit retried
+BROKER_IDLE_WARNING = 30  # seconds without any connected worker before evaluate() warns
+BROKER_IDLE_DEADLINE = 600  # seconds without any connected worker before evaluate() raises TimeoutError
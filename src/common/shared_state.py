@@ -0,0 +1,120 @@
+import numpy as np
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict
+from src.common.settings import SHM_NAME, SHM_SLOTS, OBSTACLE_SPACING, WIDTH
+
+# header: [number of snapshots written, population size, max obstacles, number of slots]
+HEADER_SIZE = 4
+# per obstacle: x, y, height, is_top, gate_open, key_x, key_y, key_collected
+OBSTACLE_FIELDS = 8
+
+
+def snapshot_dtype(population_size: int, max_obstacles: int) -> np.dtype:
+    return np.dtype([
+        ('seq', np.int64),  # seqlock counter; odd while the slot is being written
+        ('generation', np.int64),
+        ('tick', np.int64),
+        ('alive', np.int64),
+        ('score', np.int64),
+        ('best_fitness', np.float64),
+        ('ticks_per_second', np.float64),
+        ('n_obstacles', np.int64),
+        ('champion', np.int64),  # live player with the highest (score, keyscore), first on ties; -1 if none
+        ('obstacles', np.float32, (max_obstacles, OBSTACLE_FIELDS)),
+        ('player_y', np.float32, (population_size,)),
+        ('player_alive', np.uint8, (population_size,)),
+    ])
+
+
+class StatePublisher():
+    """Writes simulation snapshots into a shared-memory ring buffer.
+
+    The writer never waits for readers: each slot is guarded by a seqlock
+    counter, so a viewer attaching, lagging or exiting has no effect on the
+    simulation. Readers just take the most recent consistent slot.
+    """
+
+    def __init__(self, population_size: int, name: str = SHM_NAME, n_slots: int = SHM_SLOTS,
+                 max_obstacles: int = WIDTH // OBSTACLE_SPACING + 2) -> None:
+        self.dtype = snapshot_dtype(population_size, max_obstacles)
+        self.max_obstacles = max_obstacles
+        size = HEADER_SIZE * 8 + n_slots * self.dtype.itemsize
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:  # left behind by a crashed run
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.header = np.ndarray(HEADER_SIZE, dtype=np.int64, buffer=self.shm.buf)
+        self.slots = np.ndarray(n_slots, dtype=self.dtype, buffer=self.shm.buf, offset=HEADER_SIZE * 8)
+        self.slots[:] = np.zeros(1, dtype=self.dtype)
+        self.header[:] = [0, population_size, max_obstacles, n_slots]
+
+    def publish(self, sim, hud: Dict[str, float]) -> None:
+        """Stores the state of a Simulation plus HUD values (generation, best_fitness, ticks_per_second)."""
+        count = int(self.header[0])
+        slot = self.slots[count % len(self.slots)]
+        slot['seq'] += 1
+        slot['generation'] = hud.get('generation', 0)
+        slot['tick'] = sim.tick
+        slot['alive'] = np.count_nonzero(sim.is_alive)
+        slot['score'] = sim.score.max()
+        slot['best_fitness'] = hud.get('best_fitness', 0)
+        slot['ticks_per_second'] = hud.get('ticks_per_second', 0)
+        # the living player with the highest (score, keyscore), first on ties, as main.py ranks its champion
+        alive = np.flatnonzero(sim.is_alive)
+        champion = alive[np.lexsort((-alive, sim.keyscore[alive], sim.score[alive]))[-1]] if len(alive) else -1
+        entries = list(sim.world.entries)[:self.max_obstacles]
+        slot['n_obstacles'] = len(entries)
+        for i, (obstacle, gate, key) in enumerate(entries):
+            # key and gate state is per player; the upcoming ones are shown as the champion sees them
+            upcoming = i == sim.world.cursor and champion >= 0
+            slot['obstacles'][i] = (obstacle.x, obstacle.y, obstacle.height, obstacle.category == 'top',
+                                    upcoming and sim.gate_open[champion], key.x, key.y,
+                                    upcoming and sim.key_collected[champion])
+        slot['champion'] = champion
+        n = min(len(sim.y), len(slot['player_y']))  # the population may be resized between generations
+        slot['player_y'][:n] = sim.y[:n]
+        slot['player_alive'][:n] = sim.is_alive[:n]
+        slot['player_alive'][n:] = 0
+        slot['seq'] += 1
+        self.header[0] = count + 1
+
+    def close(self) -> None:
+        del self.header, self.slots
+        self.shm.close()
+        self.shm.unlink()
+
+
+class StateReader():
+    """Read-only view of a StatePublisher's ring buffer, usable from another process."""
+
+    def __init__(self, name: str = SHM_NAME) -> None:
+        self.shm = shared_memory.SharedMemory(name=name)
+        # only the publisher owns the segment; stop this process from unlinking it on exit
+        try:
+            resource_tracker.unregister(self.shm._name, 'shared_memory')
+        except Exception:
+            pass
+        self.header = np.ndarray(HEADER_SIZE, dtype=np.int64, buffer=self.shm.buf)
+        _, population_size, max_obstacles, n_slots = (int(v) for v in self.header)
+        self.dtype = snapshot_dtype(population_size, max_obstacles)
+        self.slots = np.ndarray(n_slots, dtype=self.dtype, buffer=self.shm.buf, offset=HEADER_SIZE * 8)
+
+    def latest(self):
+        """Copy of the newest consistent snapshot, or None if nothing was published yet."""
+        for _ in range(len(self.slots)):
+            count = int(self.header[0])
+            if count == 0:
+                return None
+            slot = self.slots[(count - 1) % len(self.slots)]
+            seq = int(slot['seq'])
+            snapshot = slot.copy()
+            if seq % 2 == 0 and int(slot['seq']) == seq:
+                return snapshot
+        return None
+
+    def close(self) -> None:
+        del self.header, self.slots
+        self.shm.close()
@@ -0,0 +1,176 @@
+import numpy as np
+from typing import NamedTuple, Tuple
+from src.common.settings import PLAYER_START_HEIGHT, PLAYER_START_POS, HEIGHT, BASE_HEIGHT, GAME_FPS, DECISION_THRESHOLD, FITNESS_WEIGHT_ALIVE, FITNESS_WEIGHT_KEYSCORE, WIDTH, OBSTACLE_SPEED, OBSTACLE_SPACING, MAX_TICKS, KERNEL
+from src.common.world import World
+from src.common.kernel import make_kernel
+
+
+def sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+class Snapshot(NamedTuple):
+    """Full state of one player and its course between two ticks (see Simulation.snapshot)."""
+    world: World  # private copy of obstacles, gates, keys, cursor and rng
+    seed: int
+    tick: int
+    y: float
+    vy: float
+    has_key: bool
+    key_collected: bool
+    gate_open: bool
+    passed: bool
+    jump_tick: int
+    score: int
+    keyscore: int
+
+    def fitness(self) -> float:
+        """Simulation.fitness() of the player up to the snapshot: the credit genomes forked from it start with."""
+        norm_factor = WIDTH / OBSTACLE_SPEED / GAME_FPS
+        return round(FITNESS_WEIGHT_ALIVE * self.tick / GAME_FPS / norm_factor + FITNESS_WEIGHT_KEYSCORE * self.keyscore, 3)
+
+
+class Simulation():
+    """Headless, tick-based counterpart of the AI game loop in main.py.
+
+    The whole population is stepped at once with NumPy arrays on one seeded
+    course. Nothing depends on wall-clock time: the jump cooldown is counted in
+    ticks and time alive is ticks / GAME_FPS, so a run is fully determined by the
+    weights and the course seed and can go as fast as the CPU allows.
+
+    Key and gate state is per player: a key touch only opens the gate for the
+    player that collected it, and the shared Key / Gate objects are never
+    modified. Each genome's result therefore depends on its own weights and the
+    seed alone, whatever else is in the population.
+
+    The tick is done by a kernel from kernel.py (numba if installed, else
+    in-place NumPy); features() and decide() are the plain NumPy reference
+    for the NN part.
+    """
+
+    def __init__(self, weights_input: np.ndarray, weights_hidden: np.ndarray, seed: int,
+                 max_ticks: int = MAX_TICKS, spacing: int = OBSTACLE_SPACING, kernel: str = KERNEL) -> None:
+        n = len(weights_input)
+        self.weights_input = weights_input  # (n, 7, 4)
+        self.weights_hidden = weights_hidden  # (n, 4, 1)
+        self.seed = seed
+        self.world = World(rng=np.random.RandomState(seed), spacing=spacing)
+        self.max_ticks = max_ticks
+        self.tick = 0
+        self.x = PLAYER_START_POS
+        self.y = np.full(n, PLAYER_START_HEIGHT, dtype=np.float64)
+        self.vy = np.zeros(n)
+        self.is_alive = np.ones(n, dtype=bool)
+        self.has_key = np.zeros(n, dtype=bool)  # carries the upcoming key, until past its obstacle
+        self.key_collected = np.zeros(n, dtype=bool)  # collected the upcoming key
+        self.gate_open = np.zeros(n, dtype=bool)  # the upcoming gate is open for this player
+        self.passed = np.zeros(n, dtype=bool)  # scored the upcoming obstacle already
+        self.score = np.zeros(n, dtype=np.int64)
+        self.keyscore = np.zeros(n, dtype=np.int64)
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.jump_tick = np.zeros(n, dtype=np.int64)  # tick of the last jump
+        self.jumped = np.zeros(n, dtype=bool)  # jumps executed during the last tick
+        self.kernel = make_kernel(weights_input, weights_hidden, kernel)  # the tick itself, see kernel.py
+
+    @classmethod
+    def from_snapshot(cls, weights_input: np.ndarray, weights_hidden: np.ndarray, snapshot: Snapshot,
+                      max_ticks: int = MAX_TICKS, kernel: str = KERNEL) -> 'Simulation':
+        """Every genome continues the snapshot's run from where it was taken.
+
+        All players start in the snapshotted player's state, on a copy of its course,
+        and are credited with its ticks, score and keys so far; the snapshot itself
+        stays unchanged and can be forked again.
+        """
+        sim = cls(weights_input, weights_hidden, seed=snapshot.seed, max_ticks=max_ticks,
+                  spacing=snapshot.world.spacing, kernel=kernel)
+        sim.world = snapshot.world.snapshot()
+        sim.tick = snapshot.tick
+        sim.y[:] = snapshot.y
+        sim.vy[:] = snapshot.vy
+        sim.has_key[:] = snapshot.has_key
+        sim.key_collected[:] = snapshot.key_collected
+        sim.gate_open[:] = snapshot.gate_open
+        sim.passed[:] = snapshot.passed
+        sim.jump_tick[:] = snapshot.jump_tick
+        sim.score[:] = snapshot.score
+        sim.keyscore[:] = snapshot.keyscore
+        sim.ticks[:] = snapshot.tick
+        return sim
+
+    def snapshot(self, player: int) -> Snapshot:
+        """State of one (live) player and the course at the current tick."""
+        return Snapshot(self.world.snapshot(), self.seed, self.tick, float(self.y[player]), float(self.vy[player]),
+                        bool(self.has_key[player]), bool(self.key_collected[player]), bool(self.gate_open[player]),
+                        bool(self.passed[player]), int(self.jump_tick[player]), int(self.score[player]),
+                        int(self.keyscore[player]))
+
+    def features(self, obstacle, key) -> np.ndarray:
+        """The seven NN inputs of Player.NN_update, one row per player."""
+        dx = np.full(len(self.y), obstacle.x - self.x, dtype=np.float64)
+        dx_key = self.x - max(key.x, min(self.x, key.x + key.size))
+        dy_key = self.y - np.maximum(key.y, np.minimum(self.y, key.y + key.size))
+        dx_key = np.where(self.has_key, 0, dx_key)
+        dy_key = np.where(self.has_key, 0, dy_key)
+        if obstacle.category == 'bottom':
+            dy_top = self.y - BASE_HEIGHT
+            dy_bottom = obstacle.y - self.y
+        else:
+            dy_top = obstacle.y - self.y
+            dy_bottom = HEIGHT - BASE_HEIGHT - self.y
+        return np.stack([self.y, self.vy, dx, dy_bottom, dy_top, dx_key, dy_key], axis=1)
+
+    def decide(self, features: np.ndarray) -> np.ndarray:
+        """Batched Player.NN_jump."""
+        hidden = sigmoid(np.einsum('ni,nij->nj', features, self.weights_input))
+        prediction = sigmoid(np.einsum('nj,njk->nk', hidden, self.weights_hidden))[:, 0]
+        return prediction > DECISION_THRESHOLD
+
+    def step(self) -> bool:
+        """Advances one tick. Returns False once every player is dead or the tick cap is hit."""
+        if self.world.update():
+            self.passed[:] = False
+            self.key_collected[:] = False
+            self.gate_open[:] = False
+        obstacle, _, key = self.world.upcoming()
+        self.kernel.step(self, obstacle, key)
+        self.tick += 1
+        return bool(self.is_alive.any()) and self.tick < self.max_ticks
+
+    def run(self) -> np.ndarray:
+        while self.step():
+            pass
+        return self.fitness()
+
+    def time_alive(self) -> np.ndarray:
+        return self.ticks / GAME_FPS
+
+    def fitness(self) -> np.ndarray:
+        """Player.fitness() for every player, with time alive measured in ticks."""
+        norm_factor = WIDTH / OBSTACLE_SPEED / GAME_FPS
+        return np.round(FITNESS_WEIGHT_ALIVE * self.time_alive() / norm_factor + FITNESS_WEIGHT_KEYSCORE * self.keyscore, 3)
+
+
+def evaluate(weights_input: np.ndarray, weights_hidden: np.ndarray, seed: int,
+             max_ticks: int = MAX_TICKS) -> Tuple[np.ndarray, np.ndarray]:
+    """Fitness and time alive of every genome on the course generated from `seed`."""
+    sim = Simulation(weights_input, weights_hidden, seed=seed, max_ticks=max_ticks)
+    return sim.run(), sim.time_alive()
+
+
+def fork_point(weights_input: np.ndarray, weights_hidden: np.ndarray, tick: int, seed: int | None = None,
+               start: Snapshot | None = None) -> Snapshot | None:
+    """Snapshot of a single genome's run at `tick`, replayed on course `seed` or from `start`.
+
+    A genome's run depends only on its weights and the course, so replaying it alone
+    reproduces the run it had within its population. None if it dies before `tick`.
+    """
+    weights_input, weights_hidden = weights_input[None], weights_hidden[None]
+    if start is None:
+        sim = Simulation(weights_input, weights_hidden, seed=seed, max_ticks=tick)
+    else:
+        sim = Simulation.from_snapshot(weights_input, weights_hidden, start, max_ticks=tick)
+    while sim.tick < tick and sim.step():
+        pass
+    if sim.tick < tick or not sim.is_alive[0]:
+        return None
+    return sim.snapshot(0)
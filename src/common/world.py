@@ -0,0 +1,73 @@
+import copy
+from collections import deque
+from typing import Deque, Tuple
+from src.common.settings import OBSTACLE_SPEED, OBSTACLE_SPACING, OBSTACLE_WIDTH, PLAYER_START_POS, PLAYER_RADIUS, WIDTH
+from src.common.obstacle import Obstacle
+from src.common.gate import Gate
+from src.common.key import Key
+
+
+class World():
+    """The course: a deque of (obstacle, gate, key) tuples sorted by x.
+
+    New tuples are appended on the right edge of the screen every `spacing`
+    pixels and popped from the left once they leave the screen, so spawning
+    and despawning are amortized O(1). The cursor points at the first tuple
+    the players (who all stand at PLAYER_START_POS) have not yet passed.
+    """
+
+    def __init__(self, rng=None, spacing: int = OBSTACLE_SPACING) -> None:
+        self.rng = rng
+        self.spacing = spacing
+        self.entries: Deque[Tuple[Obstacle, Gate, Key]] = deque()
+        self.cursor = 0  # index of the nearest upcoming tuple in entries
+        self.passed = 0  # total number of obstacles passed so far
+        self.spawn()
+
+    def spawn(self) -> None:
+        obstacle = Obstacle(rng=self.rng)
+        gate = Gate(obstacle=obstacle)
+        key = Key(rng=self.rng)
+        # keys keep their 1/3 - 2/3 screen lead on the obstacle, compressed on dense courses
+        lead = (WIDTH - key.x) * min(1.0, (self.spacing - OBSTACLE_WIDTH) / (2 * WIDTH // 3))
+        key.x = obstacle.x - lead
+        self.entries.append((obstacle, gate, key))
+
+    def update(self) -> bool:
+        """Moves the course one tick to the left. Returns True if the upcoming obstacle changed."""
+        for obstacle, gate, key in self.entries:
+            obstacle.x -= OBSTACLE_SPEED
+            gate.x -= OBSTACLE_SPEED
+            key.x -= OBSTACLE_SPEED
+        advanced = False
+        while self.entries and self.entries[0][0].is_outside():
+            self.entries.popleft()
+            if self.cursor == 0:  # only happens if no later tuple had spawned yet
+                self.passed += 1
+                advanced = True
+            self.cursor = max(0, self.cursor - 1)
+        if not self.entries or self.entries[-1][0].x <= WIDTH - self.spacing:
+            self.spawn()
+        while self.cursor < len(self.entries) - 1 and self.is_passed(self.entries[self.cursor][0]):
+            self.cursor += 1
+            self.passed += 1
+            advanced = True
+        return advanced
+
+    def is_passed(self, obstacle: Obstacle) -> bool:
+        return obstacle.x + obstacle.width + PLAYER_RADIUS < PLAYER_START_POS
+
+    def snapshot(self) -> 'World':
+        """Independent copy of the course: every obstacle, gate and key, the cursor,
+        the pass count and the rng state, so the copy spawns the same future course."""
+        return copy.deepcopy(self)
+
+    def upcoming(self) -> Tuple[Obstacle, Gate, Key]:
+        """Nearest obstacle, gate and key the players have not passed yet."""
+        return self.entries[self.cursor]
+
+    def draw(self, screen) -> None:
+        for obstacle, gate, key in self.entries:
+            obstacle.draw(screen)
+            gate.draw(screen)
+            key.draw(screen)
@@ -2,9 +2,9 @@ import pygame as pg
 import numpy as np
 import time
 import sys
-import heapq
 from typing import List, Dict, Any
 from pathlib import Path
+from src.common.selection import truncation
 
 # Global Variables
 WIDTH = 1200
@@ -299,8 +299,9 @@ def run_game_ga():
             if all(player.is_dead for player in population):
 
                 # -- GENETIC ALGORITHM: Evolve current generation and intialize new generation --
-                best_players = heapq.nlargest(
-                    KEEP_PARENTS, population, key=lambda player: (player.fitness_score()))
+                # O(P) elite extraction on a fitness array, best first (all players if fewer than KEEP_PARENTS)
+                fitness = np.array([player.fitness_score() for player in population])
+                best_players = [population[i] for i in truncation(fitness, KEEP_PARENTS)]
                 best_times = [
                     best_player.time_alive for best_player in best_players]
                 best_genes = [
@@ -2,13 +2,27 @@ import pygame as pg
 import numpy as np
 import src.common.settings as c
 from src.common.player import Player
-from src.common.obstacle import Obstacle
-from src.common.gate import Gate
-from src.common.key import Key
+from src.common.world import World
+from src.common.replay import ReplayRecorder
+from src.common.metrics import MetricsExporter
+from src.common.memory import MemoryMonitor
+from src.common.evolution import GENOME_SIZE, flatten, unflatten
+from src.common.optimizers import make_optimizer
+from src.common.selection import truncation
+from src.common.hall_of_fame import HallOfFame
+from src.common.lineage import Lineage, SAMPLED
+from src.common.lod import draw_density
+from src.common.champion import Champion, export_champion
+from src.common.demonstrations import PlayRecorder, warm_start_genomes
+from src.common.shared_state import StateReader
+from multiprocessing import shared_memory
+from pathlib import Path
 from typing import Dict, List
 import sys
-import copy
-import random
+import time
+import signal
+import subprocess
+import atexit
 
 
 # -- Initialize Pygame --
@@ -38,30 +52,38 @@ info_text = {
 info_toggle = True
 # - Logic -
 obstacle_flags: List[bool] = [False] * c.POPULATION_SIZE
+space_pressed = False  # user jump of the current tick, applied in the update step
 # - Data -
-best_players = {
-    'generation': [],
-    'player_id': [],
-    'weights_input': [],
-    'weights_hidden': [],
-    'time_alive': [],
-    'highscore': [],
-    'fitness': []
-}
+hall_of_fame = HallOfFame()  # top-k genomes across generations
+lineage = Lineage()  # ID, parents, operator, score and deaths of every genome
+optimizer = make_optimizer(c.OPTIMIZER, c.POPULATION_SIZE, hall_of_fame,
+                           initial=warm_start_genomes(c.POPULATION_SIZE) if c.is_AI and c.WARM_START else None,
+                           lineage=lineage)
 best_overall_time = 0
 best_overall_iw = None
 best_overall_hw = None
 best_overall_fitness = 0
 overall_highscore = 0
 overall_deaths = 0
-# player scores accessed via player_scores['scores'][player_idx][generation]
-player_scores = {
-    'player_id': [0] * c.POPULATION_SIZE,
-    'scores': [[] for _ in range(c.POPULATION_SIZE)],
-    'deaths': [0] * c.POPULATION_SIZE
-}
 gen_score = 0
 gen_scores = []
+replay = ReplayRecorder()
+play_log = PlayRecorder() if not c.is_AI and c.RECORD_HUMAN_PLAY else None
+# the course of each generation is generated from its own seed (see reset())
+course_seed = np.random.randint(2**31 - 1)
+course_rng = np.random.RandomState(course_seed)
+# - Monitoring -
+metrics = None
+if c.METRICS_PORT is not None:
+    metrics = MetricsExporter(port=c.METRICS_PORT)
+    metrics.start()
+memory_monitor = None
+if c.MEMORY_MONITOR:
+    memory_monitor = MemoryMonitor()
+    memory_monitor.start()
+run_start_time = time.time()
+gen_start_time = time.time()
+gen_ticks = 0
 
 # - AI Variables -
 population: List[Player] = []
@@ -72,15 +94,22 @@ generation = 1
 # -- FUNCTIONS --
 def init() -> None:
     if c.is_AI:
+        genomes = optimizer.ask()
+        weights_input, weights_hidden = unflatten(genomes)
         for i in range(c.POPULATION_SIZE):
             population.append(Player(is_AI=True))
-            player_scores['player_id'][i] = id(population[i])
-
-
-def reset(obstacle: Obstacle, gate: Gate, key: Key, players: List[Player] | Player) -> None:
-    obstacle.__init__()
-    gate.__init__(obstacle=obstacle)
-    key.__init__()
+            population[i].weights_input = weights_input[i]
+            population[i].weights_hidden = weights_hidden[i]
+            if optimizer.genome_size > GENOME_SIZE:
+                population[i].step_size = genomes[i, GENOME_SIZE]
+            population[i].genome_id = optimizer.ids[i]
+
+
+def reset(world: World, players: List[Player] | Player) -> None:
+    global course_seed
+    course_seed = np.random.randint(2**31 - 1)
+    course_rng.seed(course_seed)
+    world.__init__(rng=course_rng)
     if c.is_AI and isinstance(players, List):
         for _ in players:
             _.__init__(is_AI=c.is_AI)
@@ -139,7 +168,10 @@ def render_score(screen, score: int) -> None:
 
 def render_info_text(screen, info: Dict) -> None:
     for n, (k, v) in enumerate(info.items()):
-        if k == 'Success Rate' and generation > 1:
+        if k in ('Success Rate', 'k-Success Rate') and generation > 1 and v is None and \
+                (k == 'Success Rate' or generation >= c.EM_KSUCCESS):
+            text = font.render(f"{k}: n/a for {c.OPTIMIZER} (sampled genomes have no line)", True, c.FONT_INFO_COLOR)
+        elif k == 'Success Rate' and generation > 1:
             text = font.render(
                 f"Average Success Rate: {100*v['mean']:.1f}% ± {100*v['std']:.1f}%", True, c.FONT_INFO_COLOR)
         elif k == 'k-Success Rate' and generation > 1:
@@ -157,11 +189,15 @@ def render_info_text(screen, info: Dict) -> None:
         screen.blit(text, (text_x, y_offset))
 
 
-def get_success_metric(gen_length: int = generation - 1, loss_penalty: int = 1) -> Dict[str, float] | None:
-    if generation >= gen_length:
+def get_success_metric(gen_length: int | None = None, loss_penalty: int = 1) -> Dict[str, float] | None:
+    # genomes sampled by the evolution strategies have no parents, so their line is just
+    # the new, not yet played genome: the rate would always be 0
+    if (lineage.operator[[_.genome_id for _ in population]] == SAMPLED).all():
+        return None
+    if gen_length is None or generation >= gen_length:
         rates = []
         for _ in population:
-            rates.append(get_player_success(player_id=id(_),
+            rates.append(get_player_success(genome_id=_.genome_id,
                                             gen_length=gen_length,
                                             loss_penalty=loss_penalty))
         result = {
@@ -173,54 +209,109 @@ def get_success_metric(gen_length: int = generation - 1, loss_penalty: int = 1)
         return result
 
 
-def get_player_success(player_id: int, gen_length: int = generation - 1, loss_penalty: int = 1) -> float | None:
+def get_player_success(genome_id: int, gen_length: int | None = None, loss_penalty: int = 1) -> float | None:
     """Evaluation Metric: Player Jump Success Rate
-    Computes the fractional obstacle jump success rate for a particular player across generations.
+    Computes the fractional obstacle jump success rate of a genome's line across generations.
 
     Args:
-        player_id (int): Unique memory address identifier of Player object.
-        gen_length (int): Number of past generations to include for evaluating success rate.
+        genome_id (int): Lineage ID of the player's genome (Player.genome_id).
+        gen_length (int | None): Number of past generations (the genome and its first parents)
+            to include for evaluating success rate. None includes the whole line.
         loss_penalty (int): scaling factor for death/loss penalty. Default is 1, corresponding to
             a player death being worth 1 score points / obstacle passings.
 
     Returns:
-        float | None: The obstacle jump success rate of the player; an alternative performance
+        float | None: The obstacle jump success rate of the line; an alternative performance
         metric to the player time survived.
     """
-    if generation >= gen_length:
-        if player_id in player_scores['player_id']:
-            idx = player_scores['player_id'].index(player_id)
-            history = player_scores['scores'][idx][-gen_length:]
-            total = sum(history)
-            if total == 0:
-                return 0.0
-            else:
-                return 1 / (1 + ((loss_penalty * player_scores['deaths'][idx]) / sum(history)))
+    if gen_length is None or generation >= gen_length:
+        if 0 <= genome_id < len(lineage):
+            return lineage.success_rate(genome_id, loss_penalty=loss_penalty, generations=gen_length)
         else:
-            print(f"Player ID {player_id} not found")
-
-
-# - Utility Functions -
-def nested_mean(nested_list1, nested_list2):
-    """Perform component-wise averaging of two nested lists, provided
-    their shapes are identical.
-
-    Args:
-        nested_list1: First nested list.
-        nested_list2: Second nested list.
-
-    Returns:
-        The resulting component-wise averaged nested list.
-    """
-    return (np.array(nested_list1) + np.array(nested_list2)) / 2
+            print(f"Genome ID {genome_id} not found")
+
+
+def publish_metrics(fitness: List[float], gen_duration: float) -> None:
+    metrics.set('generation', generation, help='Current generation')
+    metrics.set('ticks_per_second', gen_ticks / max(gen_duration, 1e-9),
+                help='Simulated game ticks per second during the last generation')
+    metrics.set('generations_per_hour', 3600 * (generation - 1) / max(time.time() - run_start_time, 1e-9),
+                help='Completed generations per hour since start')
+    metrics.set('fitness', max(fitness), help='Fitness of the last generation', stat='best')
+    metrics.set('fitness', np.mean(fitness), stat='mean')
+    metrics.set('fitness', best_overall_fitness, stat='best_overall')
+    success = info_text['Success Rate']
+    if isinstance(success, dict):
+        metrics.set('success_rate', success['mean'],
+                    help='Mean obstacle jump success rate (get_success_metric)')
+
+
+def load_rival() -> Player | None:
+    # exported champion (see c.CHAMPION_FILE) playing alongside the user in human mode
+    if c.is_AI or not c.PLAY_WITH_CHAMPION or not Path(c.CHAMPION_FILE).exists():
+        return None
+    champion = Champion.load(c.CHAMPION_FILE)
+    if champion.mismatched_settings():
+        print(f"Champion was trained with different settings: {', '.join(champion.mismatched_settings())}")
+    rival = Player(is_AI=True)
+    rival.weights_input, rival.weights_hidden = champion.weights_input, champion.weights_hidden
+    return rival
+
+
+def start_trainer() -> subprocess.Popen | None:
+    # headless GA in a separate interpreter while the user plays (c.BACKGROUND_TRAINING)
+    if c.is_AI or not c.BACKGROUND_TRAINING:
+        return None
+    try:  # a block left behind by a crashed session would show stale stats until the trainer replaces it
+        stale = shared_memory.SharedMemory(name=c.BACKGROUND_SHM_NAME)
+        stale.close()
+        stale.unlink()
+    except FileNotFoundError:
+        pass
+    return subprocess.Popen([sys.executable, '-m', 'src.train', '--generations', str(c.BACKGROUND_GENERATIONS),
+                             '--publish', '--shm-name', c.BACKGROUND_SHM_NAME,
+                             '--publish-interval', str(c.BACKGROUND_PUBLISH_INTERVAL),
+                             '--export', c.CHAMPION_FILE], stdout=subprocess.DEVNULL)
+
+
+def stop_trainer() -> None:
+    global trainer_reader
+    if trainer_reader is not None:
+        trainer_reader.close()
+        trainer_reader = None
+    if trainer is not None and trainer.poll() is None:
+        trainer.send_signal(signal.SIGINT)  # lets the trainer close its shared memory
+        try:
+            trainer.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            trainer.kill()
+
+
+def render_trainer_status(screen) -> None:
+    global trainer_reader
+    if trainer_reader is None:
+        try:  # the trainer creates the block a moment after start
+            trainer_reader = StateReader(c.BACKGROUND_SHM_NAME)
+        except FileNotFoundError:
+            pass
+    snapshot = trainer_reader.latest() if trainer_reader is not None else None
+    if snapshot is None:
+        status = "starting..." if trainer.poll() is None else "stopped"
+    else:
+        status = (f"generation {snapshot['generation']}, best fitness {snapshot['best_fitness']:.3f}, "
+                  f"{snapshot['ticks_per_second']:.0f} ticks/s")
+    text = font.render(f"Background training: {status} (c: race the newest champion)", True, c.FONT_INFO_COLOR)
+    screen.blit(text, (20, c.BASE_HEIGHT + 20))
 
 
 # -- Main Game Loop --
 init()
 user_player = Player()
-obstacle = Obstacle()
-gate = Gate(obstacle=obstacle)
-key = Key()
+rival = load_rival()
+trainer = start_trainer()
+trainer_reader = None
+atexit.register(stop_trainer)  # also on crashes, so the trainer never outlives the game
+world = World(rng=course_rng)
 
 while True:
     if game_running:
@@ -235,7 +326,7 @@ while True:
                 if event.key == pg.K_p:
                     game_paused = not game_paused
                 if event.key == pg.K_SPACE:
-                    user_player.jump(fps=game_fps)
+                    space_pressed = True
                 if event.key == pg.K_e:  # fps control
                     game_fps += 5
                     info_text['FPS'] = game_fps
@@ -244,6 +335,8 @@ while True:
                     info_text['FPS'] = game_fps
                 if event.key == pg.K_i:  # toggle into
                     info_toggle = not info_toggle
+                if event.key == pg.K_c and not c.is_AI:  # newest exported champion as rival
+                    rival = load_rival()
 
         if not game_paused:
             # - Draw Background Elements + Render Text -
@@ -252,55 +345,70 @@ while True:
             render_score(screen, score=gen_score)
             if info_toggle:
                 render_info_text(screen, info=info_text)
+            gen_ticks += 1
 
             # - Update Info -
             if gen_score > overall_highscore:
                 info_text['Best Score'] = gen_score
 
             # - Update and Draw Objects -
-            obstacle.update()
-            if obstacle.is_outside():
+            if world.update():
                 obstacle_flags = [False] * c.POPULATION_SIZE
-            gate.update(obstacle=obstacle)
-            key.update(obstacle=obstacle)
+            obstacle, gate, key = world.upcoming()
 
             if c.is_AI:
-                display_overlaps(screen, population=population, min_overlaps=2)
+                # huge populations are drawn as a density column (level of detail)
+                lod = len(population) > c.LOD_THRESHOLD
+                if not lod:
+                    display_overlaps(screen, population=population, min_overlaps=2)
                 for i, _ in enumerate(population):
                     _.update(obstacle=obstacle, key=key, fps=game_fps)
-                    _.draw(screen)
+                    if not lod:
+                        _.draw(screen)
                     if _.x >= obstacle.x + obstacle.width and not obstacle_flags[i]:
                         _.score += 1
                         obstacle_flags[i] = True
                     if _.score > gen_score:
                         gen_score = _.score
+                if lod:
+                    alive = [_ for _ in population if _.is_alive]
+                    champion = max(alive, key=lambda player: (player.score, player.keyscore), default=None)
+                    draw_density(screen, ys=np.array([_.y for _ in alive]),
+                                 champion_y=champion.y if champion else None, font=font)
             else:
+                if play_log is not None and user_player.is_alive:
+                    # the same inputs the AI decides on, taken before the jump
+                    user_player.NN_update(obstacle, key)
+                    play_log.record(user_player.features(), space_pressed)
+                if space_pressed:
+                    user_player.jump(fps=game_fps)
+                    space_pressed = False
                 user_player.update(obstacle=obstacle, key=key, fps=game_fps)
                 user_player.draw(screen)
-            obstacle.draw(screen)
-            gate.draw(screen)
-            key.draw(screen)
+                if rival is not None:
+                    rival.update(obstacle=obstacle, key=key, fps=game_fps)
+                    rival.draw(screen)
+                    if rival.is_alive:
+                        pg.draw.circle(screen, c.CHAMPION_COLOR, (rival.x, rival.y), rival.radius, width=3)
+                if trainer is not None:
+                    render_trainer_status(screen)
+            world.draw(screen)
 
             # - Handle Collisions -
             if c.is_AI:
-                for i, _ in enumerate(population):
+                for _ in population:
                     # - Key Touch Event -
                     if _.is_alive and not _.has_key and _.is_touching(key):
-                        key.is_collected = True
+                        _.collect_key()
+                        key.is_collected = True  # drawing only; each player has its own gate state
                         gate.is_open = True
-                        _.keyscore += 1
-                        _.has_key = True
                     # - Obstacle / Locked Gate Touch Event -
-                    if _.is_alive and _.is_colliding(obstacle=obstacle, gate=gate):
+                    if _.is_alive and _.is_colliding(obstacle=obstacle):
                         _.kill()
                         dead_players.append(_)
                         overall_deaths += 1
                         gen_scores.append(_.score)
-
-                        # normally not needed if order of players in population is not changed:
-                        if id(_) in player_scores['player_id']:
-                            player_scores['scores'][i].append(_.score)
-                            player_scores['deaths'][i] += 1
+                        lineage.record(_.genome_id, _.score)
 
                 if len(dead_players) == c.POPULATION_SIZE:
                     if dead_players[-1].is_animating:  # last dead player
@@ -309,16 +417,23 @@ while True:
                         game_running = False
             else:
                 if not user_player.has_key and user_player.is_touching(key):
-                    key.is_collected = True
+                    user_player.collect_key()
+                    key.is_collected = True  # drawing only
                     gate.is_open = True
-                    user_player.keyscore += 1
-                    user_player.has_key = True
-                if user_player.is_alive and user_player.is_colliding(obstacle=obstacle, gate=gate):
+                if user_player.is_alive and user_player.is_colliding(obstacle=obstacle):
                     user_player.kill()
+                if rival is not None and rival.is_alive:
+                    # the rival's key only opens the gate for itself; the user still needs their own
+                    if not rival.has_key and rival.is_touching(key):
+                        rival.collect_key()
+                    if rival.is_colliding(obstacle=obstacle):
+                        rival.kill()
                 if not user_player.is_alive and not user_player.is_animating:
                     # - Handle game restart for user player -
-                    reset(obstacle=obstacle, gate=gate,
-                          key=key, players=user_player)
+                    if play_log is not None:
+                        play_log.end_episode()
+                    reset(world=world, players=user_player)
+                    rival = load_rival()
 
             pg.display.flip()
 
@@ -326,68 +441,44 @@ while True:
         generation_clock += game_tick / 1000
 
     else:
-        population = sorted(population, key=lambda player: player.fitness())
-
-        best_player = population[-1]
-        best_players['generation'].append(generation)
-        best_players['weights_input'].append(
-            copy.deepcopy(best_player.weights_input))
-        best_players['weights_hidden'].append(
-            copy.deepcopy(best_player.weights_hidden))
-        best_players['time_alive'].append(best_player.time_alive)
-        best_players['highscore'].append(max(gen_scores))
-        best_players['fitness'].append(best_player.fitness())
-
-        best_overall_fitness = max(best_players['fitness'])
-        best_overall_index = best_players['fitness'].index(
-            best_overall_fitness)
-        best_overall_time = max(best_players['time_alive'])
-        best_overall_iw = best_players['weights_input'][best_overall_index]
-        best_overall_hw = best_players['weights_hidden'][best_overall_index]
-        overall_highscore = max(best_players['highscore'])
-
-        # NOTE: With current implementation of reset(), it must be called
-        # BEFORE assigning new weights to population
-        reset(obstacle=obstacle, gate=gate, key=key, players=population)
-
-        # -- Crossover and Mutating --
+        # fitness is computed once per player; selection works on the array (see selection.py)
+        gen_fitness = np.array([player.fitness() for player in population])
+        best_player = population[truncation(gen_fitness, 1)[0]]
+        hall_of_fame.add(best_player.weights_input, best_player.weights_hidden,
+                         fitness=best_player.fitness(), generation=generation, genome_id=best_player.genome_id)
+        hall_of_fame.end_generation(best_player.time_alive)
+
+        if hall_of_fame.best_fitness > best_overall_fitness:
+            export_champion(c.CHAMPION_FILE, *hall_of_fame.best(), fitness=hall_of_fame.best_fitness,
+                            generation=generation)
+        best_overall_fitness = hall_of_fame.best_fitness
+        best_overall_time = max(best_overall_time, best_player.time_alive)
+        best_overall_iw, best_overall_hw = hall_of_fame.best()
+        overall_highscore = max(overall_highscore, max(gen_scores))
+
+        if c.RECORD_REPLAY:
+            replay.record(generation=generation, seed=course_seed,
+                          jump_ticks=best_player.jump_ticks, death_tick=best_player.ticks,
+                          fitness=best_player.fitness())
+            replay.save(c.REPLAY_FILE)
+
+        # -- Crossover and Mutating (or an evolution strategy, see c.OPTIMIZER) --
+        # NOTE: weights are gathered BEFORE reset(), which re-initializes the players
+        step_sizes = [_.step_size for _ in population] if optimizer.genome_size > GENOME_SIZE else None
+        optimizer.tell(flatten(np.array([_.weights_input for _ in population]),
+                               np.array([_.weights_hidden for _ in population]), step_sizes), gen_fitness)
+        genomes = optimizer.ask()
+        new_iw, new_hw = unflatten(genomes)
+        reset(world=world, players=population)
         for i, _ in enumerate(population):
-            # - Standard crossover among KEEP_PARENTS parents -
-            if i < int(len(population) * c.CROSSOVER_RATE):
-                parents_iw = random.sample(
-                    [population[-j-1].weights_input for j in range(c.KEEP_PARENTS)], 2)
-                parents_hw = random.sample(
-                    [population[-j-1].weights_hidden for j in range(c.KEEP_PARENTS)], 2)
-
-                child_iw = nested_mean(parents_iw[0], parents_iw[1])
-                child_hw = nested_mean(parents_hw[0], parents_hw[1])
-
-                # NOTE: Must deepcopy for nested lists
-                _.weights_input = copy.deepcopy(child_iw)
-                _.weights_hidden = copy.deepcopy(child_hw)
-                _.mutate()
-
-            # - Cross-generation crossover -
-            elif i < int(len(population) * (c.CROSS_GENERATION_RATE + c.CROSSOVER_RATE)):
-                parents_iw = [population[-1].weights_input, best_overall_iw]
-                parents_hw = [population[-1].weights_hidden, best_overall_hw]
-
-                child_iw = nested_mean(parents_iw[0], parents_iw[1])
-                child_hw = nested_mean(parents_hw[0], parents_hw[1])
-
-                _.weights_input = copy.deepcopy(child_iw)
-                _.weights_hidden = copy.deepcopy(child_hw)
-                _.mutate()
-
-            # - Cloning or Resetting -
-            else:
-                # randomize if above generation threshold with no performance improvement
-                if (generation % c.RESET_THRESHOLD == 0) and (best_players['time_alive'][-c.RESET_THRESHOLD] > best_players['time_alive'][-1]):
-                    _.__init__(is_AI=c.is_AI)
-                else:
-                    _.weights_input = copy.deepcopy(best_overall_iw)
-                    _.weights_hidden = copy.deepcopy(best_overall_hw)
-                    _.mutate()
+            _.weights_input = new_iw[i]
+            _.weights_hidden = new_hw[i]
+            _.genome_id = optimizer.ids[i]
+            if optimizer.genome_size > GENOME_SIZE:
+                _.step_size = genomes[i, GENOME_SIZE]
+
+        if memory_monitor is not None:
+            memory_monitor.end_generation(generation, metrics=metrics)
 
         # - Update/Reset Other Elements -
         dead_players = []
@@ -403,6 +494,10 @@ while True:
             loss_penalty=c.LOSS_PENALTY)
         info_text['k-Success Rate'] = get_success_metric(
             gen_length=c.EM_KSUCCESS, loss_penalty=c.LOSS_PENALTY)
+        if metrics is not None:
+            publish_metrics(gen_fitness, gen_duration=time.time() - gen_start_time)
+        gen_start_time = time.time()
+        gen_ticks = 0
 
         if generation < c.MAX_GENERATIONS:
             game_running = True
@@ -0,0 +1,113 @@
+"""
+Replay viewer for the best player of each generation, as recorded by main.py.
+Usage:
+    python -m src.playback [replay_file] [--generation N] [--fps F] [--skip]
+
+Controls:
+    p: pause, e/q: faster/slower, d: jump to death tick,
+    r: restart run, LEFT/RIGHT: previous/next generation
+"""
+import pygame as pg
+import argparse
+import sys
+import src.common.settings as c
+from src.common.replay import ReplayRun, load_replay, unpack_jumps
+
+
+def make_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Play back recorded best runs.')
+    parser.add_argument('file', nargs='?', default=c.REPLAY_FILE)
+    parser.add_argument('--generation', '-g', type=int, default=None,
+                        help='generation to start at (default: last recorded)')
+    parser.add_argument('--fps', type=int, default=c.GAME_FPS)
+    parser.add_argument('--skip', action='store_true',
+                        help='start each run at its death tick')
+    return parser
+
+
+def draw(screen) -> None:
+    screen.fill(c.BG_COLOR)
+    pg.draw.rect(screen, c.BASE_COLOR, (0, c.HEIGHT -
+                 c.BASE_HEIGHT, c.WIDTH, c.HEIGHT))  # Ground
+    pg.draw.rect(screen, c.BASE_COLOR, (0, 0, c.WIDTH, c.BASE_HEIGHT))  # Roof
+
+
+def render_info_text(screen, font, info: dict) -> None:
+    for n, (k, v) in enumerate(info.items()):
+        text = font.render(f"{k}: {v}", True, c.FONT_INFO_COLOR)
+        screen.blit(text, (c.WIDTH - text.get_width() - 20,
+                           c.BASE_HEIGHT + 20 + n * c.FONT_SIZE))
+
+
+def load_run(replay, index: int, skip: bool) -> ReplayRun:
+    run = ReplayRun(seed=int(replay['seed'][index]),
+                    jumps=unpack_jumps(replay, index))
+    if skip:
+        run.seek(run.death_tick)
+    return run
+
+
+def main() -> None:
+    parser = make_parser()
+    args = parser.parse_args()
+    replay = load_replay(args.file)
+    n_runs = len(replay['generation'])
+    if n_runs == 0:
+        print(f"No runs recorded in {args.file}")
+        return
+    index = n_runs - 1
+    if args.generation is not None:
+        recorded = [int(generation) for generation in replay['generation']]
+        if args.generation not in recorded:
+            parser.error(f"generation {args.generation} is not recorded in {args.file}; "
+                         f"available: {', '.join(map(str, recorded))}")
+        index = recorded.index(args.generation)
+
+    pg.init()
+    clock = pg.time.Clock()
+    screen = pg.display.set_mode((c.WIDTH, c.HEIGHT))
+    pg.display.set_caption('Obstacle Jumping - Replay')
+    font = pg.font.SysFont(c.FONT_TYPE, c.FONT_SIZE)
+    fps = args.fps
+    paused = False
+    run = load_run(replay, index, args.skip)
+
+    while True:
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                pg.quit()
+                sys.exit()
+            elif event.type == pg.KEYDOWN:
+                if event.key == pg.K_p:
+                    paused = not paused
+                if event.key == pg.K_e:
+                    fps += 5
+                if event.key == pg.K_q:
+                    fps = max(5, fps - 5)
+                if event.key == pg.K_d:
+                    run.seek(run.death_tick)
+                if event.key == pg.K_r:
+                    run = load_run(replay, index, skip=False)
+                if event.key in (pg.K_LEFT, pg.K_RIGHT):
+                    index = (index + (1 if event.key == pg.K_RIGHT else -1)) % n_runs
+                    run = load_run(replay, index, args.skip)
+
+        if not paused:
+            run.step()
+        draw(screen)
+        run.draw(screen)
+        render_info_text(screen, font, {
+            'Generation': int(replay['generation'][index]),
+            'Seed': run.seed,
+            'Tick': f"{run.tick} / {run.death_tick}",
+            'Score': run.player.score,
+            'Keys': run.player.keyscore,
+            'Fitness': float(replay['fitness'][index]),
+            'FPS': fps
+        })
+        pg.display.flip()
+        clock.tick(fps)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,410 @@
+"""
+Headless GA training at full speed: no pygame window and no frame cap.
+Usage:
+    python -m src.train [--generations N] [--population P] [--seed S] [--optimizer {ga,cmaes,nes}]
+                        [--publish [--publish-interval N] [--shm-name NAME]] [--viewer] [--export [PATH]]
+                        [--memory-monitor] [--warm-start [PATH]]
+                        [--broker [--host HOST] [--port PORT] [--local-workers N]]
+                        [--budget DURATION] [--checkpoint [PATH]] [--resume [PATH]] [--fork]
+                        [--compact [--genome-dtype {int8,float16}]]
+
+With --publish, the state of every tick (or every N ticks) is written to a shared-memory ring
+buffer that a viewer (python -m src.viewer) can attach to and detach from at
+any time without affecting training speed. --viewer also starts one.
+
+With --broker, each generation is evaluated by TCP workers (python -m src.worker)
+instead of in this process; --local-workers starts N of them on localhost.
+The broker listens on localhost unless --host says otherwise (e.g. 0.0.0.0 for
+workers on other machines). It does not authenticate workers: anyone who can
+connect receives genomes and can return arbitrary fitness, so only expose it on
+a trusted network.
+
+With --budget (e.g. --budget 2h --broker --local-workers 8 for two hours on eight
+cores), population size, episodes per genome and the tick cap are adapted every
+generation to the measured throughput (see scheduler.py), and training stops with
+a checkpoint once the time is used up; --resume continues from it.
+
+With --fork, once a champion has died, part of every generation starts from a
+snapshot taken FORK_LEAD_TICKS before its death instead of at tick 0, so those
+offspring spend their ticks on the segment that killed their parent.
+
+With --compact, populations of millions are trained with quantized genomes and
+CompactSimulation (see src/common/compact.py), using the GA only.
+"""
+import argparse
+import subprocess
+import sys
+import time
+import numpy as np
+import src.common.settings as c
+from src.common.simulation import Simulation, fork_point
+from src.common.evolution import unflatten
+from src.common.optimizers import make_optimizer
+from src.common.selection import truncation
+from src.common.metrics import MetricsExporter
+from src.common.memory import MemoryMonitor
+from src.common.shared_state import StatePublisher
+from src.common.hall_of_fame import HallOfFame
+from src.common.broker import Broker
+from src.common.champion import export_champion
+from src.common.demonstrations import warm_start_genomes
+from src.common.scheduler import BudgetScheduler, parse_duration
+from src.common.checkpoint import save_checkpoint, load_checkpoint
+from src.common.compact import CompactSimulation, random_genomes, next_generation_compact, dequantize
+from typing import Callable
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Train the GA without rendering.')
+    parser.add_argument('--generations', '-g', type=int, default=None,
+                        help=f'default {c.MAX_GENERATIONS}, or unlimited with --budget')
+    parser.add_argument('--population', '-p', type=int, default=c.POPULATION_SIZE)
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--optimizer', choices=('ga', 'cmaes', 'nes'), default=None,
+                        help=f"default {c.OPTIMIZER}, or the checkpoint's with --resume")
+    parser.add_argument('--publish', action='store_true',
+                        help='publish state snapshots to shared memory for src.viewer')
+    parser.add_argument('--publish-interval', type=int, default=1, metavar='N',
+                        help='publish every N ticks only (the last tick of a generation is always published)')
+    parser.add_argument('--shm-name', default=c.SHM_NAME, help='shared-memory block to publish to')
+    parser.add_argument('--viewer', action='store_true',
+                        help='publish snapshots and open a viewer process')
+    parser.add_argument('--export', nargs='?', const=c.CHAMPION_FILE, default=None, metavar='PATH',
+                        help=f'export each new best genome (default path {c.CHAMPION_FILE})')
+    parser.add_argument('--warm-start', nargs='?', const=c.HUMAN_PLAY_FILE,
+                        default=c.HUMAN_PLAY_FILE if c.WARM_START else None, metavar='PATH',
+                        help=f'fit the first population to recorded human play (default path {c.HUMAN_PLAY_FILE})')
+    parser.add_argument('--memory-monitor', action='store_true', default=c.MEMORY_MONITOR,
+                        help=f'report memory use every {c.MEMORY_MONITOR_INTERVAL} generations')
+    parser.add_argument('--broker', action='store_true',
+                        help='evaluate generations on remote workers')
+    parser.add_argument('--host', default=c.BROKER_HOST,
+                        help='interface the broker listens on, e.g. 0.0.0.0 for remote workers (unauthenticated)')
+    parser.add_argument('--port', type=int, default=c.BROKER_PORT)
+    parser.add_argument('--local-workers', type=int, default=0,
+                        help='number of worker processes to start on localhost')
+    parser.add_argument('--budget', type=parse_duration, default=None, metavar='DURATION',
+                        help='train for this long (e.g. 90m, 2h), adapting population, episodes and tick cap')
+    parser.add_argument('--checkpoint', nargs='?', const=c.CHECKPOINT_FILE, default=None, metavar='PATH',
+                        help=f'save population and hall of fame when training stops (default path '
+                             f'{c.CHECKPOINT_FILE}, always on with --budget)')
+    parser.add_argument('--resume', nargs='?', const=c.CHECKPOINT_FILE, default=None, metavar='PATH',
+                        help='continue from a checkpoint')
+    parser.add_argument('--fork', action='store_true', default=c.FORK,
+                        help=f'evaluate {c.FORK_FRACTION:.0%} of each generation from a snapshot '
+                             f'{c.FORK_LEAD_TICKS} ticks before the last champion died')
+    parser.add_argument('--compact', action='store_true',
+                        help='memory-compact mode for very large populations')
+    parser.add_argument('--genome-dtype', choices=('int8', 'float16'), default=c.COMPACT_GENOME_DTYPE,
+                        help='genome storage in --compact mode')
+    return parser.parse_args()
+
+
+def train(generations: int = c.MAX_GENERATIONS, population_size: int = c.POPULATION_SIZE, seed: int | None = None,
+          publisher: StatePublisher | None = None, metrics: MetricsExporter | None = None, verbose: bool = True,
+          evaluator: Callable | None = None, optimizer: str | None = c.OPTIMIZER, export: str | None = None,
+          callback: Callable | None = None, memory: MemoryMonitor | None = None,
+          publish_interval: int = 1, warm_start: str | None = None, scheduler: BudgetScheduler | None = None,
+          checkpoint: str | None = None, resume: str | None = None, fork: bool = c.FORK,
+          max_ticks: int = c.MAX_TICKS) -> HallOfFame:
+    """Runs the GA of main.py (or another optimizer) on Simulation and returns its hall of fame.
+
+    evaluator(weights_input, weights_hidden, seed, max_ticks) -> (fitness, time_alive) replaces the
+    local Simulation, e.g. Broker.evaluate; snapshots are then not published.
+    max_ticks caps every episode, unless a scheduler (a BudgetScheduler) is given: it picks
+    population size, episodes per genome and tick cap of every generation and ends training when its time budget is used up.
+    checkpoint is written when training ends; resume continues from one exactly where it stopped:
+    optimizer state (Optimizer.state_dict), hall of fame and rng. optimizer None then takes the
+    checkpoint's optimizer, a different one raises ValueError.
+    publisher gets every publish_interval-th tick plus the last tick of each generation.
+    With fork (local evaluation only), FORK_FRACTION of each generation continues the run of the
+    previous full-course champion from FORK_LEAD_TICKS before its death (see Simulation.from_snapshot).
+    Forked genomes are ranked among themselves by their fitness on that segment and take the
+    full-course fitness at the same quantile (see forked_fitness), so they never outrank the
+    full-course champion, which alone enters the hall of fame and picks the next fork point. The
+    rest plays full courses.
+    warm_start is a human play log to fit the first population to (see demonstrations.py).
+    With export, every new best genome is written there by export_champion().
+    callback(generation, fitness, time_alive) runs after each generation; training stops
+    early if it returns True. memory, if given, must be started and reports every few generations.
+    """
+    rng = np.random.RandomState(seed)
+    hall_of_fame = HallOfFame()
+    first_generation = 1
+    state = None
+    if resume is not None:
+        state = load_checkpoint(resume)
+        if optimizer is None:
+            optimizer = state['optimizer']
+        elif optimizer != state['optimizer']:
+            raise ValueError(f"{resume} was written with optimizer '{state['optimizer']}', cannot resume "
+                             f"it with '{optimizer}'")
+        initial, hall_of_fame = state['genomes'], state['hall_of_fame']  # genomes: version 1 files only
+        first_generation = state['generation'] + 1
+        if initial is not None:
+            population_size = len(initial)
+    else:
+        initial = warm_start_genomes(population_size, warm_start, rng) if warm_start is not None else None
+        if warm_start is not None and initial is None and verbose:
+            print(f"No usable recorded play at {warm_start}, starting from random weights")
+    optimizer = optimizer or c.OPTIMIZER
+    evolver = make_optimizer(optimizer, population_size, hall_of_fame, rng=rng, initial=initial)
+    if state is not None and state['optimizer_state'] is not None:
+        evolver.load_state_dict(state['optimizer_state'])
+    if state is not None and state['rng_state'] is not None:
+        rng.set_state(state['rng_state'])
+    run_start_time = time.perf_counter()
+    hud = {'generation': first_generation, 'best_fitness': 0.0, 'ticks_per_second': 0.0}
+    completed = first_generation - 1
+    episodes = 1
+    fork_snapshot = None  # where the next generation's forked genomes start
+
+    for generation in range(first_generation, first_generation + generations):
+        gen_start_time = time.perf_counter()
+        if scheduler is not None:
+            plan = scheduler.next_plan()
+            if plan is None:
+                if verbose:
+                    print(f"Time budget used up after generation {completed}")
+                break
+            if plan.population_size != evolver.population_size:
+                evolver.resize(plan.population_size)
+            episodes, max_ticks = plan.episodes, plan.max_ticks
+        hud['generation'] = generation
+        genomes = evolver.ask()
+        weights_input, weights_hidden = unflatten(genomes)
+        n = len(genomes)
+        forked = np.zeros(n, dtype=bool)  # genomes evaluated from fork_snapshot
+        if fork_snapshot is not None and fork_snapshot.tick < max_ticks:
+            forked[rng.permutation(n)[:min(int(c.FORK_FRACTION * n), n - 1)]] = True
+        full = np.flatnonzero(~forked) if forked.any() else slice(None)  # genomes evaluated on full courses
+        fitness, time_alive = np.empty(n), np.empty(n)
+        ticks = np.zeros((n, episodes), dtype=np.int64)  # ticks survived per episode (forked: column 0 only)
+        simulated_ticks = 0
+        results = []  # (fitness, time_alive) per episode
+        course_seeds = []
+        eval_start_time = time.perf_counter()
+        for episode in range(episodes):
+            course_seed = rng.randint(2**31 - 1)
+            course_seeds.append(course_seed)
+            if evaluator is not None:
+                results.append(evaluator(weights_input[full], weights_hidden[full], course_seed, max_ticks))
+                continue
+            sim = Simulation(weights_input[full], weights_hidden[full], seed=course_seed, max_ticks=max_ticks)
+            if publisher is None:
+                sim.run()
+            else:
+                while sim.step():
+                    if sim.tick % publish_interval == 0:
+                        publisher.publish(sim, hud)
+                publisher.publish(sim, hud)
+            results.append((sim.fitness(), sim.time_alive()))
+        fitness[full] = np.mean([result[0] for result in results], axis=0)
+        time_alive[full] = np.mean([result[1] for result in results], axis=0)
+        ticks[full] = np.rint(np.stack([result[1] for result in results], axis=1) * c.GAME_FPS)
+        simulated_ticks += sum(result[1].max() for result in results) * c.GAME_FPS
+        if forked.any():
+            sim = Simulation.from_snapshot(weights_input[forked], weights_hidden[forked], fork_snapshot,
+                                           max_ticks=max_ticks)
+            fitness[forked] = forked_fitness(sim.run() - fork_snapshot.fitness(), fitness[full])
+            time_alive[forked] = sim.time_alive()
+            ticks[forked, 0] = sim.ticks
+            simulated_ticks += sim.tick - fork_snapshot.tick
+        ticks_per_second = simulated_ticks / max(time.perf_counter() - eval_start_time, 1e-9)
+
+        # the champion is the best full-course genome: forked fitness is only a stand-in for ranking
+        best = np.flatnonzero(~forked)[truncation(fitness[~forked], 1)[0]]
+        champion_fitness, champion_time_alive = fitness[best], time_alive[best]
+        previous_best = hall_of_fame.best_fitness
+        # share of genomes beating the best fitness so far, full-course runs only
+        success_rate = np.mean(fitness[~forked] > previous_best) if (~forked).any() else np.nan
+        hall_of_fame.add(weights_input[best], weights_hidden[best], fitness=champion_fitness, generation=generation)
+        if export is not None and hall_of_fame.best_fitness > previous_best:
+            export_champion(export, *hall_of_fame.best(), fitness=hall_of_fame.best_fitness, generation=generation)
+        hall_of_fame.end_generation(champion_time_alive)
+        forked_from = fork_snapshot.tick if forked.any() else None
+        if fork and evaluator is None:
+            fork_snapshot = next_fork_snapshot(weights_input[best], weights_hidden[best], ticks[best], max_ticks,
+                                               course_seeds)
+
+        hud['best_fitness'] = hall_of_fame.best_fitness
+        hud['ticks_per_second'] = ticks_per_second
+        if verbose:
+            print(f"Generation {generation}: best {champion_fitness:.3f}, mean {fitness.mean():.3f}, "
+                  f"best overall {hall_of_fame.best_fitness:.3f}, {ticks_per_second:.0f} ticks/s" +
+                  (f" ({len(genomes)} genomes x {episodes} episodes, cap {max_ticks} ticks, "
+                   f"{scheduler.remaining():.0f} s left)" if scheduler is not None else '') +
+                  (f", {forked.sum()} forked at tick {forked_from}" if forked_from is not None else ''))
+        if metrics is not None:
+            metrics.set('generation', generation, help='Current generation')
+            metrics.set('ticks_per_second', ticks_per_second,
+                        help='Simulated game ticks per second during the last generation')
+            metrics.set('generations_per_hour',
+                        3600 * (generation - first_generation + 1) / (time.perf_counter() - run_start_time),
+                        help='Completed generations per hour since start')
+            if scheduler is not None:
+                metrics.set('budget_remaining_seconds', scheduler.remaining(),
+                            help='Wall-clock time left in the training budget')
+            metrics.set('fitness', champion_fitness, help='Fitness of the last generation', stat='best')
+            metrics.set('fitness', fitness.mean(), stat='mean')
+            metrics.set('fitness', hall_of_fame.best_fitness, stat='best_overall')
+            metrics.set('success_rate', success_rate,
+                        help='Share of genomes that beat the best fitness of all previous generations')
+
+        if memory is not None:
+            memory.end_generation(generation, metrics=metrics)
+
+        # - Evolution -
+        evolver.tell(genomes, fitness)
+        completed = generation
+        if scheduler is not None:
+            if forked_from is not None:
+                ticks[forked, 0] -= forked_from  # only the ticks actually simulated count towards throughput
+            scheduler.record(ticks, time.perf_counter() - gen_start_time)
+        if callback is not None and callback(generation, fitness, time_alive):
+            break
+    if checkpoint is not None:
+        save_checkpoint(checkpoint, evolver, hall_of_fame, completed, optimizer, rng)
+        if verbose:
+            print(f"Checkpoint of generation {completed} written to {checkpoint}")
+    return hall_of_fame
+
+
+def next_fork_snapshot(weights_input: np.ndarray, weights_hidden: np.ndarray, ticks: np.ndarray, max_ticks: int,
+                       course_seeds: list):
+    """Snapshot FORK_LEAD_TICKS before the full-course champion's death, on the course it got furthest on.
+
+    ticks are the champion's ticks survived per episode. None (full courses again) if it
+    survived to the tick cap or died within the first FORK_LEAD_TICKS.
+    """
+    episode = int(np.argmax(ticks))
+    death_tick = int(ticks[episode])
+    tick = death_tick - c.FORK_LEAD_TICKS
+    if death_tick >= max_ticks or tick <= 0:
+        return None
+    return fork_point(weights_input, weights_hidden, tick, seed=course_seeds[episode])
+
+
+def forked_fitness(segment: np.ndarray, full_fitness: np.ndarray) -> np.ndarray:
+    """Full-course fitness stand-ins for forked genomes, comparable across both groups.
+
+    Forked genomes are ranked by their segment fitness (from the fork point on, without
+    the snapshot's credit); each takes the full-course fitness at its rank's quantile, tied
+    segments sharing one. Quantiles are rank midpoints, so the best forked genome stays
+    below the full-course best.
+    """
+    ordered = np.sort(segment)
+    ranks = (np.searchsorted(ordered, segment, side='left') + np.searchsorted(ordered, segment, side='right')) / 2
+    return np.round(np.quantile(full_fitness, ranks / len(segment)), 3)
+
+
+def train_compact(generations: int = c.MAX_GENERATIONS, population_size: int = c.POPULATION_SIZE,
+                  seed: int | None = None, genome_dtype: str = c.COMPACT_GENOME_DTYPE,
+                  metrics: MetricsExporter | None = None, verbose: bool = True, export: str | None = None,
+                  callback: Callable | None = None, memory: MemoryMonitor | None = None) -> HallOfFame:
+    """train() for massive populations: quantized genomes, CompactSimulation and next_generation_compact().
+
+    Only the best genome of each generation is ever held as float64, for the hall of fame.
+    """
+    rng = np.random.RandomState(seed)
+    hall_of_fame = HallOfFame()
+    genomes, scale = random_genomes(population_size, genome_dtype, rng)
+
+    for generation in range(1, generations + 1):
+        course_seed = rng.randint(2**31 - 1)
+        gen_start_time = time.perf_counter()
+        sim = CompactSimulation(genomes, scale, seed=course_seed)
+        fitness = sim.run()
+        time_alive = sim.time_alive()
+        ticks_per_second = time_alive.max() * c.GAME_FPS / max(time.perf_counter() - gen_start_time, 1e-9)
+
+        best = truncation(fitness, 1)[0]
+        weights_input, weights_hidden = unflatten(
+            dequantize(genomes[best:best + 1], None if scale is None else scale[best:best + 1], np.float64))
+        previous_best = hall_of_fame.best_fitness
+        success_rate = np.mean(fitness > previous_best)  # share of genomes beating the best fitness so far
+        hall_of_fame.add(weights_input[0], weights_hidden[0], fitness=float(fitness[best]), generation=generation)
+        if export is not None and hall_of_fame.best_fitness > previous_best:
+            export_champion(export, *hall_of_fame.best(), fitness=hall_of_fame.best_fitness, generation=generation)
+        hall_of_fame.end_generation(time_alive[best])
+
+        if verbose:
+            print(f"Generation {generation}: best {fitness[best]:.3f}, mean {fitness.mean():.3f}, "
+                  f"best overall {hall_of_fame.best_fitness:.3f}, {ticks_per_second:.0f} ticks/s")
+        if metrics is not None:
+            metrics.set('generation', generation, help='Current generation')
+            metrics.set('ticks_per_second', ticks_per_second,
+                        help='Simulated game ticks per second during the last generation')
+            metrics.set('fitness', fitness[best], help='Fitness of the last generation', stat='best')
+            metrics.set('fitness', fitness.mean(), stat='mean')
+            metrics.set('fitness', hall_of_fame.best_fitness, stat='best_overall')
+            metrics.set('success_rate', success_rate,
+                        help='Share of genomes that beat the best fitness of all previous generations')
+        if memory is not None:
+            memory.end_generation(generation, metrics=metrics)
+
+        # - Evolution -
+        genomes, scale = next_generation_compact(genomes, scale, fitness, rng)
+        if callback is not None and callback(generation, fitness, time_alive):
+            break
+    return hall_of_fame
+
+
+def main() -> None:
+    args = parse_args()
+    publisher = None
+    if args.publish or args.viewer:
+        population_size = c.BUDGET_POPULATION_BOUNDS[1] if args.budget is not None else args.population
+        publisher = StatePublisher(population_size=population_size, name=args.shm_name)
+    if args.viewer:
+        # a fully separate interpreter, so the viewer can never block or slow down training
+        subprocess.Popen([sys.executable, '-m', 'src.viewer', '--name', args.shm_name])
+    metrics = None
+    if c.METRICS_PORT is not None:
+        metrics = MetricsExporter(port=c.METRICS_PORT)
+        metrics.start()
+    memory = None
+    if args.memory_monitor:
+        memory = MemoryMonitor()
+        memory.start()
+    broker = None
+    if args.broker:
+        broker = Broker(host=args.host, port=args.port)
+        broker.start()
+        worker_host = '127.0.0.1' if args.host in ('0.0.0.0', '') else args.host
+        for _ in range(args.local_workers):
+            subprocess.Popen([sys.executable, '-m', 'src.worker', '--host', worker_host, '--port', str(broker.port)])
+        print(f"Broker listening on {args.host}:{broker.port}")
+    generations = args.generations
+    if generations is None:
+        generations = sys.maxsize if args.budget is not None else c.MAX_GENERATIONS
+    scheduler = None
+    checkpoint = args.checkpoint
+    if args.budget is not None:
+        scheduler = BudgetScheduler(args.budget, population_size=args.population)
+        checkpoint = checkpoint or c.CHECKPOINT_FILE
+    try:
+        if args.compact:
+            train_compact(generations=generations, population_size=args.population, seed=args.seed,
+                          genome_dtype=args.genome_dtype, metrics=metrics, export=args.export, memory=memory)
+        else:
+            train(generations=generations, population_size=args.population, seed=args.seed,
+                  publisher=publisher, metrics=metrics, evaluator=broker.evaluate if broker else None,
+                  optimizer=args.optimizer, export=args.export, memory=memory,
+                  publish_interval=args.publish_interval, warm_start=args.warm_start, scheduler=scheduler,
+                  checkpoint=checkpoint, resume=args.resume, fork=args.fork)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if broker is not None:
+            broker.close()
+        if publisher is not None:
+            publisher.close()
+        if metrics is not None:
+            metrics.stop()
+        if memory is not None:
+            memory.stop()
+
+
+if __name__ == '__main__':
+    main()
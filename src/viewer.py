@@ -0,0 +1,110 @@
+"""
+Viewer for headless training (python -m src.train --publish).
+Usage:
+    python -m src.viewer [--fps F]
+
+Reads the newest state snapshot from shared memory at its own frame rate; it
+can be opened and closed at any time without slowing down the trainer.
+"""
+import pygame as pg
+import argparse
+import sys
+import src.common.settings as c
+from src.common.obstacle import Obstacle
+from src.common.gate import Gate
+from src.common.key import Key
+from src.common.shared_state import StateReader
+from src.common.lod import draw_density
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Watch headless training.')
+    parser.add_argument('--name', default=c.SHM_NAME, help='shared memory block to read')
+    parser.add_argument('--fps', type=int, default=c.VIEWER_FPS)
+    return parser.parse_args()
+
+
+def draw(screen) -> None:
+    screen.fill(c.BG_COLOR)
+    pg.draw.rect(screen, c.BASE_COLOR, (0, c.HEIGHT -
+                 c.BASE_HEIGHT, c.WIDTH, c.HEIGHT))  # Ground
+    pg.draw.rect(screen, c.BASE_COLOR, (0, 0, c.WIDTH, c.BASE_HEIGHT))  # Roof
+
+
+def draw_course(screen, snapshot) -> None:
+    # reuse the game objects' draw methods by overwriting their state
+    obstacle = Obstacle()
+    key = Key()
+    for x, y, height, is_top, gate_open, key_x, key_y, key_collected in snapshot['obstacles'][:snapshot['n_obstacles']].tolist():
+        obstacle.x, obstacle.y, obstacle.height = x, y, height
+        obstacle.category = 'top' if is_top else 'bottom'
+        gate = Gate(obstacle=obstacle)
+        gate.x = x
+        gate.is_open = bool(gate_open)
+        key.x, key.y, key.is_collected = key_x, key_y, bool(key_collected)
+        obstacle.draw(screen)
+        gate.draw(screen)
+        key.draw(screen)
+
+
+def draw_players(screen, snapshot, font) -> None:
+    ys = snapshot['player_y'][snapshot['player_alive'].astype(bool)]
+    if len(snapshot['player_y']) > c.LOD_THRESHOLD:
+        champion = int(snapshot['champion'])
+        draw_density(screen, ys, champion_y=snapshot['player_y'][champion] if champion >= 0 else None, font=font)
+        return
+    for y in ys.tolist():
+        pg.draw.circle(screen, c.PLAYER_COLOR, (c.PLAYER_START_POS, y), c.PLAYER_RADIUS)
+
+
+def render_info_text(screen, font, info: dict) -> None:
+    for n, (k, v) in enumerate(info.items()):
+        text = font.render(f"{k}: {v}", True, c.FONT_INFO_COLOR)
+        screen.blit(text, (c.WIDTH - text.get_width() - 20,
+                           c.BASE_HEIGHT + 20 + n * c.FONT_SIZE))
+
+
+def run_viewer(name: str = c.SHM_NAME, fps: int = c.VIEWER_FPS) -> None:
+    pg.init()
+    clock = pg.time.Clock()
+    screen = pg.display.set_mode((c.WIDTH, c.HEIGHT))
+    pg.display.set_caption('Obstacle Jumping - Training Viewer')
+    font = pg.font.SysFont(c.FONT_TYPE, c.FONT_SIZE)
+    reader = None
+
+    while True:
+        for event in pg.event.get():
+            if event.type == pg.QUIT:
+                if reader is not None:
+                    reader.close()
+                pg.quit()
+                sys.exit()
+
+        if reader is None:
+            try:
+                reader = StateReader(name=name)
+            except FileNotFoundError:
+                pass  # trainer not started yet
+        snapshot = reader.latest() if reader is not None else None
+
+        draw(screen)
+        if snapshot is None:
+            render_info_text(screen, font, {'Status': 'Waiting for trainer...'})
+        else:
+            draw_course(screen, snapshot)
+            draw_players(screen, snapshot, font)
+            render_info_text(screen, font, {
+                'Generation': int(snapshot['generation']),
+                'Tick': int(snapshot['tick']),
+                'Alive': int(snapshot['alive']),
+                'Best Score': int(snapshot['score']),
+                'Fitness': round(float(snapshot['best_fitness']), 3),
+                'Ticks/s': int(snapshot['ticks_per_second'])
+            })
+        pg.display.flip()
+        clock.tick(fps)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    run_viewer(name=args.name, fps=args.fps)
@@ -0,0 +1,39 @@
+"""
+Evaluation worker for distributed training (python -m src.train --broker).
+Usage:
+    python -m src.worker [--host HOST] [--port PORT]
+
+Connects to the broker, evaluates (genome batch, course seed) work units and
+returns their fitness until the broker shuts down.
+"""
+import argparse
+import time
+import src.common.settings as c
+from src.common.broker import run_worker
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Evaluate genomes for a training broker.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=c.BROKER_PORT)
+    parser.add_argument('--connect-timeout', type=float, default=30,
+                        help='seconds to keep retrying while the broker is not up yet')
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    deadline = time.time() + args.connect_timeout
+    while True:
+        try:
+            units = run_worker(host=args.host, port=args.port)
+            break
+        except ConnectionRefusedError:
+            if time.time() > deadline:
+                raise
+            time.sleep(0.5)
+    print(f"Worker done after {units} work units")
+
+
+if __name__ == '__main__':
+    main()